@@ -4,7 +4,9 @@ from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login
 from .forms import RegistrationForm
 from django.contrib import messages
+from django.db.models import Count
 from orders.models import Order
+from orders.stats import order_stats
 from .models import Address
 
 
@@ -12,16 +14,21 @@ from .models import Address
 def dashboard(request):
     """User dashboard showing orders and profile summary"""
     user = request.user
-    orders = Order.objects.filter(user=user).order_by('-created_at')
+    recent_orders = (
+        Order.objects.filter(user=user)
+        .annotate(item_count=Count('items'))
+        .order_by('-created_at')[:5]
+    )
     address = Address.objects.filter(user=user).first()
+    stats = order_stats(user)
     
     context = {
         'user': user,
-        'orders': orders,
+        'recent_orders': recent_orders,
         'address': address,
-        'total_orders': orders.count(),
-        'paid_orders': orders.filter(status='paid').count(),
-        'pending_orders': orders.filter(status='pending').count(),
+        'total_orders': stats['total'],
+        'paid_orders': stats['paid'],
+        'pending_orders': stats['pending'],
     }
     return render(request, 'accounts/dashboard.html', context)
 
@@ -35,6 +35,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'orders.middleware.CartMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -51,6 +52,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'orders.context_processors.cart',
             ],
         },
     },
@@ -79,9 +81,79 @@ LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/"
 
+# Cache
+# The catalog alias can point at any Django cache backend, e.g.
+# CATALOG_CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+# CATALOG_CACHE_LOCATION=/var/tmp/ecommerce_catalog
+# The catalog cache holds the catalog version every worker reads, so outside
+# DEBUG it must be shared (database, Redis, Memcached); `check --deploy` fails
+# otherwise (products.E001)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "catalog": {
+        "BACKEND": os.getenv(
+            "CATALOG_CACHE_BACKEND",
+            "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CATALOG_CACHE_LOCATION", "catalog"),
+    },
+}
+
+CATALOG_CACHE_ALIAS = "catalog"
+CATALOG_CACHE_TIMEOUT = int(os.getenv("CATALOG_CACHE_TIMEOUT", 300))
+
+# Where anonymous carts are kept. The signed cookie needs no server-side
+# write when adding to the cart; the session and cache backends suit carts
+# too large for a cookie (the cache one needs a cache shared by all workers).
+# orders.cart_storage.SignedCookieCartStorage | SessionCartStorage | CacheCartStorage
+CART_STORAGE = os.getenv("CART_STORAGE", "orders.cart_storage.SignedCookieCartStorage")
+CART_CACHE_ALIAS = os.getenv("CART_CACHE_ALIAS", "default")
+
+# Seconds a user's dashboard order counts are cached (0 turns the cache off);
+# they are dropped whenever one of the user's orders changes. Only used when
+# the alias is shared by all processes; a local-memory cache is skipped.
+ORDER_STATS_TIMEOUT = int(os.getenv("ORDER_STATS_TIMEOUT", 300))
+ORDER_STATS_CACHE_ALIAS = os.getenv("ORDER_STATS_CACHE_ALIAS", "default")
+
+# Seconds checkout holds stock for; expired holds are released by
+# `manage.py release_expired_reservations`
+STOCK_RESERVATION_TTL = int(os.getenv("STOCK_RESERVATION_TTL", 600))
+
+# Seconds a checkout idempotency key is remembered; older keys are removed
+# by `manage.py purge_idempotency_keys`
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", 60 * 60 * 24))
+
 # Razorpay
 RAZORPAY_KEY_ID = os.getenv("RAZORPAY_KEY_ID")
 RAZORPAY_KEY_SECRET = os.getenv("RAZORPAY_KEY_SECRET")
+# Secret set for the webhook in the Razorpay dashboard
+RAZORPAY_WEBHOOK_SECRET = os.getenv("RAZORPAY_WEBHOOK_SECRET")
+# Only set to talk to a stand-in such as `manage.py fake_razorpay`
+RAZORPAY_BASE_URL = os.getenv("RAZORPAY_BASE_URL")
+# (connect, read) seconds for calls to the Razorpay API
+RAZORPAY_TIMEOUT = (
+    float(os.getenv("RAZORPAY_CONNECT_TIMEOUT", 3)),
+    float(os.getenv("RAZORPAY_READ_TIMEOUT", 10)),
+)
+
+# Outbound gateway calls (Razorpay, Brevo): keep-alive connections per
+# process, retries of idempotent requests, and the circuit breaker that
+# stops calling a provider after this many failures in a row
+GATEWAY_POOL_SIZE = int(os.getenv("GATEWAY_POOL_SIZE", 10))
+GATEWAY_RETRIES = int(os.getenv("GATEWAY_RETRIES", 2))
+GATEWAY_BREAKER_THRESHOLD = int(os.getenv("GATEWAY_BREAKER_THRESHOLD", 5))
+GATEWAY_BREAKER_RESET = float(os.getenv("GATEWAY_BREAKER_RESET", 30))
+
+# Storage alias (see STORAGES) that rendered invoice PDFs are kept in
+INVOICE_STORAGE = os.getenv("INVOICE_STORAGE", "invoices")
+# How invoices are drawn: orders.invoice.render_invoice (ReportLab platypus)
+# or orders.invoice_canvas.render_invoice (fixed layout, several times faster)
+INVOICE_RENDERER = os.getenv("INVOICE_RENDERER", "orders.invoice.render_invoice")
+# Orders with this many lines or more are streamed: items read in chunks,
+# drawn by the canvas renderer and spooled to a temp file
+INVOICE_STREAM_MIN_ITEMS = int(os.getenv("INVOICE_STREAM_MIN_ITEMS", 500))
 
 # Email
 EMAIL_BACKEND = os.getenv(
@@ -96,6 +168,14 @@ EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "noreply@ecommerce.com")
 BREVO_API_KEY = os.getenv("BREVO_API_KEY")
+# (connect, read) seconds for calls to the Brevo API
+BREVO_TIMEOUT = (
+    float(os.getenv("BREVO_CONNECT_TIMEOUT", 3)),
+    float(os.getenv("BREVO_READ_TIMEOUT", 10)),
+)
+# How `manage.py run_outbox` delivers queued emails; payments.outbox.StubTransport
+# keeps them in memory instead (tests, local development)
+EMAIL_OUTBOX_TRANSPORT = os.getenv("EMAIL_OUTBOX_TRANSPORT", "payments.outbox.BrevoTransport")
 SERVER_EMAIL = os.getenv("SERVER_EMAIL", "server@ecommerce.com")
 
 # Cloudinary
@@ -24,6 +24,12 @@ STORAGES = {
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
     },
+    # Invoices are private, so they stay off the public media storage. The
+    # directory only caches them: a missing file is rendered again.
+    "invoices": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": os.getenv("INVOICE_ROOT", os.path.join(BASE_DIR, "invoices"))},
+    },
 }
 
 MEDIA_URL = ""
\ No newline at end of file
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import CartItem, Order, OrderItem, StockReservation
+from .reservations import release_reservations
 
 
 class OrderItemInline(admin.TabularInline):
@@ -11,4 +12,31 @@ class OrderItemInline(admin.TabularInline):
 class OrderAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "total_price", "status", "created_at")
     list_filter = ("status", "created_at")
-    inlines = [OrderItemInline]
\ No newline at end of file
+    inlines = [OrderItemInline]
+
+
+@admin.register(CartItem)
+class CartItemAdmin(admin.ModelAdmin):
+    list_display = ("user", "product", "quantity", "updated_at")
+    raw_id_fields = ("user", "product")
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ("user", "product", "quantity", "expires_at")
+    list_filter = ("expires_at",)
+    raw_id_fields = ("user", "product")
+
+    # Holds are counted in Product.reserved, so they are only taken by
+    # checkout and only removed through release_reservations
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def delete_model(self, request, obj):
+        release_reservations(StockReservation.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        release_reservations(queryset)
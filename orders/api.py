@@ -0,0 +1,68 @@
+import json
+
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+
+from products.models import Product
+from .cart import Cart
+from .cart_storage import CartFull
+
+# Upper bound for one line, so a typo can't put 10**9 items in the cart
+MAX_QUANTITY = 1000
+
+
+def _parse_quantities(body):
+    """
+    Validate a {"items": {product_id: quantity}} payload, returning the
+    quantities keyed by product id and a dict of per-line errors.
+    """
+    try:
+        payload = json.loads(body or b"{}")
+    except (ValueError, UnicodeDecodeError):
+        return None, {"items": "Request body must be JSON"}
+
+    items = payload.get("items") if isinstance(payload, dict) else None
+    if not isinstance(items, dict):
+        return None, {"items": 'Expected {"items": {"<product_id>": <quantity>}}'}
+
+    quantities = {}
+    errors = {}
+    for product_id, qty in items.items():
+        if not str(product_id).isdigit():
+            errors[product_id] = "Invalid product id"
+        elif type(qty) is not int or not 0 <= qty <= MAX_QUANTITY:
+            errors[product_id] = f"Quantity must be a whole number from 0 to {MAX_QUANTITY}"
+        else:
+            quantities[int(product_id)] = qty
+
+    # Only lines being added or changed need to refer to a real product
+    wanted = [product_id for product_id, qty in quantities.items() if qty]
+    existing = set(Product.objects.filter(id__in=wanted).values_list("id", flat=True))
+    for product_id in wanted:
+        if product_id not in existing:
+            errors[str(product_id)] = "Product not found"
+
+    return quantities, errors
+
+
+@require_http_methods(["GET", "POST"])
+def cart_api(request):
+    """
+    GET /orders/api/cart/ returns the priced cart.
+    POST {"items": {"<product_id>": <quantity>, ...}} sets every listed
+    line at once (0 removes it) and returns the re-priced cart. The batch
+    is applied only if every line is valid.
+    """
+    cart = Cart(request)
+
+    if request.method == "POST":
+        quantities, errors = _parse_quantities(request.body)
+        if errors:
+            return JsonResponse({"errors": errors}, status=400)
+
+        try:
+            cart.update(quantities)
+        except CartFull as e:
+            return JsonResponse({"errors": {"items": str(e)}}, status=400)
+
+    return JsonResponse(cart.snapshot().as_dict())
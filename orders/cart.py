@@ -1,14 +1,68 @@
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db.models import Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
 from products.models import Product
+from .cart_storage import CartFull, UserCartStorage, anonymous_storage_class, get_storage
+
+
+@dataclass(frozen=True)
+class CartLine:
+    product: Product
+    quantity: int
+    price: Decimal
+    total: Decimal
+    # Units this shopper can buy: stock not reserved, plus their own holds
+    stock_left: int
+    available: bool
+
+
+@dataclass(frozen=True)
+class CartSnapshot:
+    """Priced view of the cart, computed once per request"""
+    lines: tuple
+    subtotal: Decimal
+    item_count: int
+    available: bool
+
+    def as_dict(self):
+        return {
+            "items": [
+                {
+                    "product_id": line.product.id,
+                    "name": line.product.name,
+                    "price": str(line.price),
+                    "quantity": line.quantity,
+                    "total": str(line.total),
+                    "available": line.available,
+                }
+                for line in self.lines
+            ],
+            "subtotal": str(self.subtotal),
+            "item_count": self.item_count,
+            "available": self.available,
+        }
 
 
 class Cart:
 
+    # The snapshot is kept on the request so every Cart(request) built while
+    # handling it (views, templates) shares one product query
+    SNAPSHOT_ATTR = "_cart_snapshot"
+    CART_ATTR = "_cart_contents"
+
     def __init__(self, request):
-        self.session = request.session
-        cart = self.session.get("cart")
+        self.request = request
+        self.storage = get_storage(request)
 
-        if not cart:
-            cart = self.session["cart"] = {}
+        # Loaded once per request; every Cart built for it shares the dict
+        cart = getattr(request, self.CART_ATTR, None)
+        if cart is None:
+            cart = self.storage.load()
+            setattr(request, self.CART_ATTR, cart)
 
         self.cart = cart
 
@@ -16,6 +70,9 @@ class Cart:
         product_id = str(product_id)
 
         if product_id not in self.cart:
+            max_lines = self.storage.max_lines
+            if max_lines is not None and len(self.cart) >= max_lines:
+                raise CartFull(f"A cart can hold at most {max_lines} different products")
             self.cart[product_id] = 0
 
         self.cart[product_id] += qty
@@ -28,29 +85,112 @@ class Cart:
             del self.cart[product_id]
             self.save()
 
+    def update(self, quantities):
+        """Set several line quantities in one save; a quantity of 0 removes the line"""
+        cart = dict(self.cart)
+        for product_id, qty in quantities.items():
+            product_id = str(product_id)
+            if qty:
+                cart[product_id] = qty
+            else:
+                cart.pop(product_id, None)
+
+        max_lines = self.storage.max_lines
+        if max_lines is not None and len(cart) > max_lines:
+            raise CartFull(f"A cart can hold at most {max_lines} different products")
+
+        # Update in place: other Carts built for this request share the dict
+        self.cart.clear()
+        self.cart.update(cart)
+        self.save()
+
     def clear(self):
-        self.session["cart"] = {}
+        self.cart.clear()
         self.save()
 
     def save(self):
-        self.session.modified = True
-
-    def items(self):
-        products = Product.objects.filter(id__in=self.cart.keys())
-
-        result = []
-
+        self.storage.save(self.cart)
+        self.invalidate()
+
+    def __len__(self):
+        return len(self.cart)
+
+    def fingerprint(self):
+        """Stable string for the cart contents, used in conditional GET ETags"""
+        return ",".join(f"{product_id}:{qty}" for product_id, qty in sorted(self.cart.items()))
+
+    def invalidate(self):
+        self.request.__dict__.pop(self.SNAPSHOT_ATTR, None)
+
+    def snapshot(self):
+        snapshot = getattr(self.request, self.SNAPSHOT_ATTR, None)
+        if snapshot is None:
+            snapshot = self._build_snapshot()
+            setattr(self.request, self.SNAPSHOT_ATTR, snapshot)
+        return snapshot
+
+    def _build_snapshot(self):
+        products = Product.objects.filter(id__in=self.cart.keys()).only(
+            "id", "name", "price", "stock", "reserved", "image", "category"
+        )
+
+        user = self.request.user
+        if user.is_authenticated:
+            # Stock the user holds for checkout is still theirs to buy
+            products = products.annotate(held=Coalesce(Sum(
+                "reservations__quantity",
+                filter=Q(reservations__user=user, reservations__expires_at__gt=timezone.now()),
+            ), Value(0)))
+
+        lines = []
         for product in products:
             qty = self.cart[str(product.id)]
+            stock_left = min(product.available_stock + getattr(product, "held", 0), product.stock)
+
+            lines.append(CartLine(
+                product=product,
+                quantity=qty,
+                price=product.price,
+                total=product.price * qty,
+                stock_left=stock_left,
+                available=stock_left >= qty,
+            ))
+
+        return CartSnapshot(
+            lines=tuple(lines),
+            subtotal=sum((line.total for line in lines), Decimal("0")),
+            item_count=sum(line.quantity for line in lines),
+            available=all(line.available for line in lines),
+        )
 
-            result.append({
-                "product": product,
-                "quantity": qty,
-                "price": product.price,
-                "total": product.price * qty
-            })
-
-        return result
+    def items(self):
+        return self.snapshot().lines
 
     def get_total_price(self):
-        return sum(item["total"] for item in self.items())
\ No newline at end of file
+        return self.snapshot().subtotal
+
+
+def merge_anonymous_cart(request, user):
+    """
+    Fold the cart built before logging in into the user's saved cart and
+    empty the anonymous one. Where both hold a product the larger quantity
+    wins, so logging in twice with the same cart doesn't double it.
+    """
+    previous = getattr(request, "_cart_storage", None)
+    if isinstance(previous, UserCartStorage):
+        return
+
+    anonymous = previous or anonymous_storage_class()(request)
+    anonymous_cart = anonymous.load()
+
+    request._cart_storage = UserCartStorage(request, user, previous=anonymous)
+    request.__dict__.pop(Cart.CART_ATTR, None)
+    cart = Cart(request)
+    cart.invalidate()
+
+    if anonymous_cart:
+        cart.update({
+            product_id: max(qty, cart.cart.get(product_id, 0))
+            for product_id, qty in anonymous_cart.items()
+        })
+        anonymous.save({})
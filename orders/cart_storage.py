@@ -0,0 +1,221 @@
+import secrets
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from products.models import Product
+from .models import CartItem
+
+# Cookie lifetime for the cookie-based backends (two weeks, like sessions)
+CART_AGE = 60 * 60 * 24 * 14
+
+
+class CartFull(Exception):
+    pass
+
+
+class BaseCartStorage:
+    """
+    Where the {product_id: quantity} cart lives between requests.
+
+    `load()` is called once per request, `save()` after every change, and
+    `commit()` with the outgoing response (by CartMiddleware) so backends
+    that keep state in cookies can write them.
+    """
+
+    # Most distinct products a cart may hold, or None for no limit
+    max_lines = None
+
+    def __init__(self, request):
+        self.request = request
+
+    def load(self):
+        raise NotImplementedError
+
+    def save(self, cart):
+        raise NotImplementedError
+
+    def commit(self, response):
+        pass
+
+
+class SessionCartStorage(BaseCartStorage):
+    """Keeps the cart in the Django session (one session write per change)"""
+
+    def load(self):
+        return self.request.session.get("cart") or {}
+
+    def save(self, cart):
+        self.request.session["cart"] = cart
+        self.request.session.modified = True
+
+
+class SignedCookieCartStorage(BaseCartStorage):
+    """
+    Keeps the cart in a signed cookie encoded as "id:qty|id:qty", so adding
+    to the cart costs no server-side write at all. Meant for small carts:
+    the number of distinct lines is capped to stay under cookie size limits.
+    """
+
+    cookie_name = "cart"
+    salt = "orders.cart"
+    max_lines = 100
+
+    def __init__(self, request):
+        super().__init__(request)
+        self.cart = None
+
+    @staticmethod
+    def encode(cart):
+        return "|".join(f"{product_id}:{qty}" for product_id, qty in cart.items())
+
+    @staticmethod
+    def decode(value):
+        cart = {}
+        for line in value.split("|") if value else ():
+            product_id, _, qty = line.partition(":")
+            if product_id.isdigit() and qty.isdigit():
+                cart[product_id] = int(qty)
+        return cart
+
+    def load(self):
+        value = self.request.get_signed_cookie(
+            self.cookie_name, default="", salt=self.salt, max_age=CART_AGE
+        )
+        return self.decode(value)
+
+    def save(self, cart):
+        self.cart = cart
+
+    def commit(self, response):
+        if self.cart is None:
+            return
+
+        if self.cart:
+            response.set_signed_cookie(
+                self.cookie_name,
+                self.encode(self.cart),
+                salt=self.salt,
+                max_age=CART_AGE,
+                httponly=True,
+                samesite="Lax",
+                secure=settings.SESSION_COOKIE_SECURE,
+            )
+        else:
+            response.delete_cookie(self.cookie_name, samesite="Lax")
+
+
+class CacheCartStorage(BaseCartStorage):
+    """
+    Keeps the cart in the cache under a random id held in a cookie. Needs a
+    cache shared by all workers (Redis, memcached, file or database), set
+    with CART_CACHE_ALIAS.
+    """
+
+    cookie_name = "cart_id"
+
+    def __init__(self, request):
+        super().__init__(request)
+        self.cache = caches[getattr(settings, "CART_CACHE_ALIAS", "default")]
+        self.cart_id = request.COOKIES.get(self.cookie_name)
+        self.new_id = False
+
+    def _key(self):
+        return f"cart:{self.cart_id}"
+
+    def load(self):
+        if not self.cart_id:
+            return {}
+        return self.cache.get(self._key()) or {}
+
+    def save(self, cart):
+        if not self.cart_id:
+            self.cart_id = secrets.token_urlsafe(16)
+            self.new_id = True
+        self.cache.set(self._key(), cart, timeout=CART_AGE)
+
+    def commit(self, response):
+        if self.new_id:
+            response.set_cookie(
+                self.cookie_name,
+                self.cart_id,
+                max_age=CART_AGE,
+                httponly=True,
+                samesite="Lax",
+                secure=settings.SESSION_COOKIE_SECURE,
+            )
+
+
+class UserCartStorage(BaseCartStorage):
+    """
+    Keeps a logged-in user's cart in the CartItem table so it follows them
+    across sessions and devices. Only lines that changed are written.
+    """
+
+    def __init__(self, request, user, previous=None):
+        super().__init__(request)
+        self.user = user
+        # The anonymous storage replaced at login, which may still need to
+        # clear its cookie on the way out
+        self.previous = previous
+        self.saved = {}
+
+    def load(self):
+        self.saved = {
+            str(product_id): quantity
+            for product_id, quantity in CartItem.objects.filter(
+                user=self.user
+            ).values_list("product_id", "quantity")
+        }
+        return dict(self.saved)
+
+    def save(self, cart):
+        user = self.user
+        removed = self.saved.keys() - cart.keys()
+        changed = {
+            product_id: quantity
+            for product_id, quantity in cart.items()
+            if self.saved.get(product_id) != quantity
+        }
+
+        if removed:
+            CartItem.objects.filter(user=user, product_id__in=removed).delete()
+
+        if changed:
+            # Lines for products that no longer exist would break the foreign key
+            existing = set(Product.objects.filter(id__in=changed).values_list("id", flat=True))
+            CartItem.objects.bulk_create(
+                [
+                    CartItem(user=user, product_id=product_id, quantity=quantity)
+                    for product_id, quantity in changed.items()
+                    if int(product_id) in existing
+                ],
+                update_conflicts=True,
+                unique_fields=["user", "product"],
+                update_fields=["quantity", "updated_at"],
+            )
+
+        self.saved = dict(cart)
+
+    def commit(self, response):
+        if self.previous is not None:
+            self.previous.commit(response)
+
+
+def anonymous_storage_class():
+    return import_string(
+        getattr(settings, "CART_STORAGE", "orders.cart_storage.SessionCartStorage")
+    )
+
+
+def get_storage(request):
+    """The cart storage for this request, shared by every Cart built for it"""
+    storage = getattr(request, "_cart_storage", None)
+    if storage is None:
+        if request.user.is_authenticated:
+            storage = UserCartStorage(request, request.user)
+        else:
+            storage = anonymous_storage_class()(request)
+        request._cart_storage = storage
+    return storage
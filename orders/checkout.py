@@ -0,0 +1,133 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from django.utils import timezone
+
+from products import facets
+from products.cache import bump_catalog_version
+from products.models import Product
+from . import reservations
+from .models import IdempotencyKey, Order, OrderItem
+
+
+class OutOfStock(Exception):
+    """Raised when a cart line asks for more than is available"""
+
+    def __init__(self, short):
+        # {product_id: units available}
+        self.short = short
+        super().__init__(f"Not enough stock for products {sorted(short)}")
+
+
+class AlreadySubmitted(Exception):
+    """Raised when a checkout with the same idempotency key was already placed"""
+
+    def __init__(self, order_id):
+        self.order_id = order_id
+        super().__init__(f"Checkout already placed order {order_id}")
+
+
+def submitted_order_id(user, key):
+    """The order placed by an earlier submission with this key, if any"""
+    return IdempotencyKey.objects.filter(user=user, key=key).values_list("order_id", flat=True).first()
+
+
+def _claim(user, key):
+    """
+    Record the key before any stock is touched. A concurrent duplicate
+    waits on the unique index until the first submission commits, then
+    finds its order instead of writing anything.
+    """
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(user=user, key=key)
+    except IntegrityError:
+        raise AlreadySubmitted(submitted_order_id(user, key))
+
+
+def _lock_products(product_ids):
+    """
+    {product_id: (category_id, stock, reserved)}, locking the rows in id
+    order so concurrent checkouts sharing products queue up instead of
+    deadlocking
+    """
+    return {
+        product_id: (category_id, stock, reserved)
+        for product_id, category_id, stock, reserved in Product.objects.select_for_update()
+        .filter(id__in=product_ids)
+        .order_by("id")
+        .values_list("id", "category_id", "stock", "reserved")
+    }
+
+
+@transaction.atomic
+def place_order(user, lines, idempotency_key=None):
+    """
+    Turn priced cart lines into a pending Order in one transaction.
+
+    The user's own stock holds and any expired holds on the wanted
+    products are handed back first, then every line is
+    decremented in a single conditional UPDATE, so the number of queries
+    doesn't grow with the cart. Raises OutOfStock, leaving nothing
+    changed, when any line is short, and AlreadySubmitted when
+    `idempotency_key` was used for an earlier order.
+    """
+    claim = _claim(user, idempotency_key) if idempotency_key else None
+
+    wanted = {line.product.id: line.quantity for line in lines}
+
+    reservations.release(user)
+
+    current = _lock_products(wanted)
+    # Holds abandoned by other shoppers mustn't block the sale until the
+    # sweeper runs. The products are already locked, so releasing them
+    # takes no locks out of order.
+    if reservations.release_expired(list(wanted)):
+        current = _lock_products(wanted)
+
+    short = {}
+    for product_id, qty in wanted.items():
+        _, stock, reserved = current.get(product_id, (None, 0, 0))
+        if stock - reserved < qty:
+            short[product_id] = max(stock - reserved, 0)
+    if short:
+        raise OutOfStock(short)
+
+    quantity = Case(
+        *[When(id=product_id, then=Value(qty)) for product_id, qty in wanted.items()],
+        output_field=PositiveIntegerField(),
+    )
+    updated = Product.objects.filter(
+        id__in=wanted,
+        stock__gte=F("reserved") + quantity,
+    ).update(stock=F("stock") - quantity, updated_at=timezone.now())
+
+    # The rows are locked, so this only trips if something bypassed the lock
+    if updated != len(wanted):
+        raise OutOfStock({})
+
+    order = Order.objects.create(
+        user=user,
+        total_price=sum(line.total for line in lines),
+    )
+    OrderItem.objects.bulk_create([
+        OrderItem(
+            order=order,
+            product_id=line.product.id,
+            price=line.price,
+            quantity=line.quantity,
+        )
+        for line in lines
+    ])
+
+    if claim:
+        IdempotencyKey.objects.filter(id=claim.id).update(order=order)
+
+    # The bulk UPDATE skips the post_save signals that keep the category
+    # facets and the catalog cache in sync
+    facets.stock_changed(
+        (category_id, stock, stock - wanted[product_id])
+        for product_id, (category_id, stock, _) in current.items()
+    )
+    bump_catalog_version()
+
+    return order
@@ -0,0 +1,8 @@
+from django.utils.functional import SimpleLazyObject
+
+from .cart import Cart
+
+
+def cart(request):
+    """Number of distinct products in the cart, only loaded if a template shows it"""
+    return {"cart_count": SimpleLazyObject(lambda: len(Cart(request)))}
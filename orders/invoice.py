@@ -1,206 +1,380 @@
+import hashlib
+import json
+import tempfile
+from functools import lru_cache
+from io import BytesIO
+
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-from django.http import HttpResponse
+from django.conf import settings
+from django.core.files import File
+from django.db.models import prefetch_related_objects
+from django.core.files.storage import storages
+from django.utils.module_loading import import_string
 from orders.models import Order
 from accounts.models import Address
-from datetime import datetime
 
+# Bump when the layout changes so cached invoices are rendered again
+LAYOUT_VERSION = 1
+
+# Orders with at least this many lines are rendered in streaming mode
+STREAM_MIN_ITEMS = 500
+ITEM_CHUNK_SIZE = 2000
+# Rendered PDFs stay in memory up to this size, then spill to a temp file
+SPOOL_MAX_SIZE = 2 * 1024 * 1024
+# Draws item rows as they arrive instead of laying out one big table
+STREAMING_RENDERER = "orders.invoice_canvas.render_invoice"
+
+
+def for_invoice(queryset):
+    """Load orders with everything invoice_data reads, in three queries however many there are"""
+    return queryset.select_related("user__address").prefetch_related("items__product")
+
+
+def _item_row(name, quantity, price):
+    return [name, str(quantity), f"₹{price:.2f}", f"₹{price * quantity:.2f}"]
+
+
+def iter_item_rows(order):
+    """An order's item rows read from the database a chunk at a time, for very long orders"""
+    rows = (
+        order.items.order_by("id")
+        .values_list("product__name", "quantity", "price")
+        .iterator(chunk_size=ITEM_CHUNK_SIZE)
+    )
+    for name, quantity, price in rows:
+        yield _item_row(name, quantity, price)
+
+
+def invoice_data(order, items=None):
+    """
+    Everything printed on an order's invoice, as plain JSON-friendly data.
+    Rendering needs nothing else, so it can happen without the database,
+    in another process. Load `order` through for_invoice() to avoid a
+    query per item, or pass `items` (e.g. iter_item_rows) to stream them.
+    """
+    try:
+        address = order.user.address
+    except Address.DoesNotExist:
+        address = None
+
+    return {
+        "order_id": order.id,
+        # The invoice is dated when the order was paid (or placed), so the
+        # same order always produces the same invoice
+        "invoice_date": (order.paid_at or order.created_at).strftime("%B %d, %Y"),
+        "order_date": order.created_at.strftime("%B %d, %Y"),
+        "customer_name": order.user.get_full_name() or order.user.username,
+        "email": order.user.email,
+        "address": {
+            "full_name": address.full_name,
+            "line_1": address.address_line_1,
+            "city_line": f"{address.city}, {address.state} {address.postal_code}",
+            "country": address.country,
+            "phone": address.phone,
+        } if address else None,
+        "items": items if items is not None else [
+            _item_row(item.product.name, item.quantity, item.price)
+            for item in order.items.all()
+        ],
+        "total": f"₹{order.total_price:.2f}",
+        "is_paid": order.is_paid,
+        "paid_at": order.paid_at.strftime('%B %d, %Y at %I:%M %p') if order.is_paid and order.paid_at else None,
+    }
+
+
+def renderer_path():
+    return getattr(settings, "INVOICE_RENDERER", "orders.invoice.render_invoice")
+
+
+def get_renderer():
+    """The render_invoice function picked by the INVOICE_RENDERER setting"""
+    return import_string(renderer_path())
+
+
+def invoice_hash(data, renderer=None):
+    """
+    Content hash of an invoice; it changes whenever anything printed on
+    it, or the renderer, does. Item rows are hashed one at a time, so a
+    streamed `items` is consumed without being held in memory.
+    """
+    digest = hashlib.sha256()
+    header = {key: value for key, value in data.items() if key != "items"}
+    raw = json.dumps([LAYOUT_VERSION, renderer or renderer_path(), header], sort_keys=True, ensure_ascii=False)
+    digest.update(raw.encode("utf-8"))
+    for row in data["items"]:
+        digest.update(json.dumps(row, ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+@lru_cache(maxsize=1)
+def _styles():
+    """Paragraph and table styles, built once per process"""
+    styles = getSampleStyleSheet()
+
+    return {
+        "title": ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#2c3e50'),
+            spaceAfter=6,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold'
+        ),
+        "heading": ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=12,
+            textColor=colors.HexColor('#34495e'),
+            spaceAfter=4,
+            fontName='Helvetica-Bold'
+        ),
+        "normal": ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontSize=9,
+            alignment=TA_LEFT
+        ),
+        "paid": ParagraphStyle(
+            'Status',
+            parent=styles['Normal'],
+            fontSize=11,
+            textColor=colors.HexColor('#27ae60'),
+            fontName='Helvetica-Bold'
+        ),
+        "pending": ParagraphStyle(
+            'Status',
+            parent=styles['Normal'],
+            fontSize=11,
+            textColor=colors.HexColor('#e74c3c'),
+            fontName='Helvetica-Bold'
+        ),
+        "paid_date": ParagraphStyle(
+            'PaidDate',
+            parent=styles['Normal'],
+            fontSize=8,
+            textColor=colors.HexColor('#7f8c8d')
+        ),
+        "footer": ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=8,
+            textColor=colors.HexColor('#7f8c8d'),
+            alignment=TA_CENTER
+        ),
+        "header_table": TableStyle([
+            ('FONT', (0, 0), (0, -1), 'Helvetica-Bold', 14),
+            ('FONT', (1, 0), (1, -1), 'Helvetica', 9),
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('TEXTCOLOR', (0, 0), (0, 0), colors.HexColor('#2c3e50')),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ]),
+        "customer_table": TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('FONT', (0, 0), (-1, -1), 'Helvetica', 8),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ]),
+        "items_table": TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495e')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f0f0f0')]),
+        ]),
+        "summary_table": TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+            ('FONTNAME', (1, 3), (1, 3), 'Helvetica-Bold'),
+            ('FONTSIZE', (1, 3), (1, 3), 11),
+            ('BACKGROUND', (0, 3), (-1, 3), colors.HexColor('#2c3e50')),
+            ('TEXTCOLOR', (0, 3), (-1, 3), colors.whitesmoke),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ]),
+    }
+
+
+def render_invoice(data, output):
+    """Write the PDF for `invoice_data` output to the file-like `output`. Returns the page count"""
+    styles = _styles()
+    normal_style = styles["normal"]
 
-def generate_invoice_pdf(order):
-    """Generate PDF invoice for an order"""
-    
-    # Create HTTP response with PDF
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="invoice_order_{order.id}.pdf"'
-    
     # Create PDF document
     doc = SimpleDocTemplate(
-        response,
+        output,
         pagesize=letter,
         rightMargin=0.5*inch,
         leftMargin=0.5*inch,
         topMargin=0.5*inch,
         bottomMargin=0.5*inch,
     )
-    
+
     # Container for PDF elements
     story = []
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#2c3e50'),
-        spaceAfter=6,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=12,
-        textColor=colors.HexColor('#34495e'),
-        spaceAfter=4,
-        fontName='Helvetica-Bold'
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=9,
-        alignment=TA_LEFT
-    )
-    
+
     # Header - Company Name
-    story.append(Paragraph("🛍️ E-COMMERCE STORE", title_style))
+    story.append(Paragraph("🛍️ E-COMMERCE STORE", styles["title"]))
     story.append(Spacer(1, 0.2*inch))
-    
+
     # Invoice Title and Details
     header_data = [
-        ['INVOICE', f'Invoice #: ORD-{order.id}'],
-        ['', f'Invoice Date: {datetime.now().strftime("%B %d, %Y")}'],
-        ['', f'Order Date: {order.created_at.strftime("%B %d, %Y")}'],
+        ['INVOICE', f'Invoice #: ORD-{data["order_id"]}'],
+        ['', f'Invoice Date: {data["invoice_date"]}'],
+        ['', f'Order Date: {data["order_date"]}'],
     ]
-    
+
     header_table = Table(header_data, colWidths=[2.5*inch, 3.5*inch])
-    header_table.setStyle(TableStyle([
-        ('FONT', (0, 0), (0, -1), 'Helvetica-Bold', 14),
-        ('FONT', (1, 0), (1, -1), 'Helvetica', 9),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('TEXTCOLOR', (0, 0), (0, 0), colors.HexColor('#2c3e50')),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    
+    header_table.setStyle(styles["header_table"])
+
     story.append(header_table)
     story.append(Spacer(1, 0.2*inch))
-    
+
     # Customer and Address Information
-    address = Address.objects.filter(user=order.user).first()
-    
+    address = data["address"]
+
     cust_data = [
         [
-            [Paragraph("<b>BILL TO:</b>", heading_style),
-             Paragraph(order.user.get_full_name() or order.user.username, normal_style),
-             Paragraph(order.user.email, normal_style),
+            [Paragraph("<b>BILL TO:</b>", styles["heading"]),
+             Paragraph(data["customer_name"], normal_style),
+             Paragraph(data["email"], normal_style),
             ],
-            [Paragraph("<b>SHIP TO:</b>", heading_style),
-             Paragraph(address.full_name if address else order.user.get_full_name() or order.user.username, normal_style),
-             Paragraph(address.address_line_1 if address else "No address available", normal_style),
-             Paragraph(f"{address.city}, {address.state} {address.postal_code}" if address else "", normal_style),
-             Paragraph(address.country if address else "", normal_style),
-             Paragraph(f"Phone: {address.phone}" if address else "", normal_style),
+            [Paragraph("<b>SHIP TO:</b>", styles["heading"]),
+             Paragraph(address["full_name"] if address else data["customer_name"], normal_style),
+             Paragraph(address["line_1"] if address else "No address available", normal_style),
+             Paragraph(address["city_line"] if address else "", normal_style),
+             Paragraph(address["country"] if address else "", normal_style),
+             Paragraph(f"Phone: {address['phone']}" if address else "", normal_style),
             ]
         ]
     ]
-    
+
     cust_table = Table(cust_data, colWidths=[3.25*inch, 3.25*inch])
-    cust_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('FONT', (0, 0), (-1, -1), 'Helvetica', 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    
+    cust_table.setStyle(styles["customer_table"])
+
     story.append(cust_table)
     story.append(Spacer(1, 0.2*inch))
-    
+
     # Order Items Table
-    items_data = [['Product', 'Qty', 'Price', 'Amount']]
-    
-    for item in order.items.all():
-        items_data.append([
-            item.product.name,
-            str(item.quantity),
-            f"₹{item.price:.2f}",
-            f"₹{item.total_price:.2f}"
-        ])
-    
+    items_data = [['Product', 'Qty', 'Price', 'Amount']] + list(data["items"])
+
     items_table = Table(items_data, colWidths=[2.5*inch, 1*inch, 1.5*inch, 1.5*inch])
-    items_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495e')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f0f0f0')]),
-    ]))
-    
+    items_table.setStyle(styles["items_table"])
+
     story.append(items_table)
     story.append(Spacer(1, 0.2*inch))
-    
+
     # Summary Table
     summary_data = [
-        ['', 'Subtotal:', f'₹{order.total_price:.2f}'],
+        ['', 'Subtotal:', data["total"]],
         ['', 'Tax (0%):', '₹0.00'],
         ['', 'Shipping:', 'FREE'],
-        ['', 'TOTAL:', f'₹{order.total_price:.2f}'],
+        ['', 'TOTAL:', data["total"]],
     ]
-    
+
     summary_table = Table(summary_data, colWidths=[3.5*inch, 1.5*inch, 1.5*inch])
-    summary_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-        ('FONTNAME', (1, 3), (1, 3), 'Helvetica-Bold'),
-        ('FONTSIZE', (1, 3), (1, 3), 11),
-        ('BACKGROUND', (0, 3), (-1, 3), colors.HexColor('#2c3e50')),
-        ('TEXTCOLOR', (0, 3), (-1, 3), colors.whitesmoke),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    
+    summary_table.setStyle(styles["summary_table"])
+
     story.append(summary_table)
     story.append(Spacer(1, 0.2*inch))
-    
+
     # Payment Status
-    status_color = colors.HexColor('#27ae60') if order.is_paid else colors.HexColor('#e74c3c')
-    status_text = "✓ PAID" if order.is_paid else "PENDING"
-    
-    status_style = ParagraphStyle(
-        'Status',
-        parent=styles['Normal'],
-        fontSize=11,
-        textColor=status_color,
-        fontName='Helvetica-Bold'
-    )
-    
-    story.append(Paragraph(f"Payment Status: {status_text}", status_style))
-    
-    if order.is_paid and order.paid_at:
-        paid_date_style = ParagraphStyle(
-            'PaidDate',
-            parent=styles['Normal'],
-            fontSize=8,
-            textColor=colors.HexColor('#7f8c8d')
-        )
-        story.append(Paragraph(f"Paid on: {order.paid_at.strftime('%B %d, %Y at %I:%M %p')}", paid_date_style))
-    
+    if data["is_paid"]:
+        story.append(Paragraph("Payment Status: ✓ PAID", styles["paid"]))
+    else:
+        story.append(Paragraph("Payment Status: PENDING", styles["pending"]))
+
+    if data["paid_at"]:
+        story.append(Paragraph(f"Paid on: {data['paid_at']}", styles["paid_date"]))
+
     story.append(Spacer(1, 0.3*inch))
-    
+
     # Footer
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.HexColor('#7f8c8d'),
-        alignment=TA_CENTER
-    )
-    
-    story.append(Paragraph("Thank you for your purchase! Please keep this invoice for your records.", footer_style))
-    story.append(Paragraph("For support, visit: www.ecommerce.com | Email: support@ecommerce.com", footer_style))
-    
+    story.append(Paragraph("Thank you for your purchase! Please keep this invoice for your records.", styles["footer"]))
+    story.append(Paragraph("For support, visit: www.ecommerce.com | Email: support@ecommerce.com", styles["footer"]))
+
     # Build PDF
     doc.build(story)
-    
-    return response
+    return doc.page
+
+
+def render_invoice_bytes(data):
+    """(PDF bytes, page count); a top-level function so worker processes can run it"""
+    buffer = BytesIO()
+    pages = get_renderer()(data, buffer)
+    return buffer.getvalue(), pages
+
+
+def _storage():
+    return storages[getattr(settings, "INVOICE_STORAGE", "invoices")]
+
+
+def _render_to_file(data, renderer):
+    """Render into a temp file that only touches the disk for large PDFs"""
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    import_string(renderer)(data, output)
+    output.seek(0)
+    return output
+
+
+def get_invoice(order):
+    """
+    The stored PDF for an order, rendering it first if the order changed
+    since it was last rendered. Returns (storage name, content hash).
+
+    Orders with STREAM_MIN_ITEMS lines or more are streamed: their items
+    are read in chunks (once to hash them, again to render on a miss) and
+    drawn by the canvas renderer, so no list of every line is built.
+    """
+    streaming = order.items.count() >= getattr(settings, "INVOICE_STREAM_MIN_ITEMS", STREAM_MIN_ITEMS)
+    if streaming:
+        renderer = STREAMING_RENDERER
+        digest = invoice_hash(invoice_data(order, iter_item_rows(order)), renderer)
+    else:
+        renderer = renderer_path()
+        prefetch_related_objects([order], "items__product")
+        data = invoice_data(order)
+        digest = invoice_hash(data, renderer)
+    name = f"{order.id}/{digest}.pdf"
+
+    storage = _storage()
+    if storage.exists(name):
+        return name, digest
+
+    if streaming:
+        data = invoice_data(order, iter_item_rows(order))
+    with _render_to_file(data, renderer) as output:
+        saved = storage.save(name, File(output))
+    if saved != name:
+        # A concurrent request stored the same invoice first
+        storage.delete(saved)
+
+    # Drop the invoices rendered before the order last changed
+    _, files = storage.listdir(str(order.id))
+    for filename in files:
+        if filename != f"{digest}.pdf" and filename.endswith(".pdf"):
+            storage.delete(f"{order.id}/{filename}")
+
+    return name, digest
+
+
+def open_invoice(name):
+    """(open file, size in bytes) of a stored invoice"""
+    storage = _storage()
+    return storage.open(name, "rb"), storage.size(name)
+
+
+def prerender(order_id):
+    """Render and store an order's invoice ahead of the first download"""
+    get_invoice(Order.objects.select_related("user__address").get(id=order_id))
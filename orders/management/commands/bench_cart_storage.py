@@ -0,0 +1,94 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from orders.middleware import CartMiddleware
+from orders.views import add_to_cart
+from products.models import Product
+
+BACKENDS = {
+    'session': 'orders.cart_storage.SessionCartStorage',
+    'cookie': 'orders.cart_storage.SignedCookieCartStorage',
+    'cache': 'orders.cart_storage.CacheCartStorage',
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare cart storage backends on a run of add-to-cart requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--adds',
+            type=int,
+            default=200,
+            help='Add-to-cart requests per backend (default: 200)',
+        )
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=20,
+            help='Distinct products cycled through (default: 20)',
+        )
+        parser.add_argument(
+            '--backend',
+            choices=sorted(BACKENDS),
+            action='append',
+            help='Backend to run (repeatable, default: all)',
+        )
+
+    def handle(self, *args, **options):
+        product_ids = list(Product.objects.values_list('id', flat=True)[:options['products']])
+        if not product_ids:
+            raise CommandError('No products to add; import some first')
+
+        self.stdout.write(
+            f"🛒 {options['adds']} add-to-cart requests over {len(product_ids)} products per backend"
+        )
+
+        for name in options['backend'] or BACKENDS:
+            with override_settings(CART_STORAGE=BACKENDS[name]):
+                elapsed, queries, writes, cookie_bytes = self.run(product_ids, options['adds'])
+
+            self.stdout.write(
+                f"   {name:<8} {elapsed * 1000:8.1f} ms "
+                f"({elapsed / options['adds'] * 1e6:7.0f} µs/add), "
+                f"{queries} queries, {writes} writes, {cookie_bytes} cookie bytes"
+            )
+
+        self.stdout.write(self.style.SUCCESS('✓ Done'))
+
+    def run(self, product_ids, adds):
+        """Replay add-to-cart for one anonymous visitor, carrying cookies between requests"""
+        factory = RequestFactory()
+        handler = SessionMiddleware(CartMiddleware(
+            lambda request: add_to_cart(request, request.product_id)
+        ))
+
+        last_request = None
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            for i in range(adds):
+                request = factory.post('/orders/add/', {'next': '/'})
+                request.user = AnonymousUser()
+                request.product_id = product_ids[i % len(product_ids)]
+                response = handler(request)
+                factory.cookies.update(response.cookies)
+                last_request = request
+            elapsed = time.perf_counter() - started
+
+        writes = sum(
+            1 for query in captured.captured_queries
+            if query['sql'].lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE'))
+        )
+        cookie_bytes = sum(len(morsel.OutputString()) for morsel in factory.cookies.values())
+
+        # Don't leave the benchmark's cart behind in the session table or cache
+        last_request.session.flush()
+        last_request._cart_storage.save({})
+
+        return elapsed, len(captured.captured_queries), writes, cookie_bytes
@@ -0,0 +1,83 @@
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+RENDERERS = {
+    'platypus': 'orders.invoice.render_invoice',
+    'canvas': 'orders.invoice_canvas.render_invoice',
+}
+
+
+def sample_data(lines):
+    """Invoice data shaped like invoice_data() output, with `lines` items"""
+    return {
+        "order_id": 12345,
+        "invoice_date": "March 04, 2026",
+        "order_date": "March 03, 2026",
+        "customer_name": "Asha Verma",
+        "email": "asha@example.com",
+        "address": {
+            "full_name": "Asha Verma",
+            "line_1": "221 MG Road",
+            "city_line": "Bengaluru, Karnataka 560001",
+            "country": "India",
+            "phone": "9800000000",
+        },
+        "items": [
+            [f"Sample product {i}", str(i % 5 + 1), "₹499.00", f"₹{499 * (i % 5 + 1):.2f}"]
+            for i in range(lines)
+        ],
+        "total": "₹1497.00",
+        "is_paid": True,
+        "paid_at": "March 04, 2026 at 10:15 AM",
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare the platypus and canvas invoice renderers on small and long orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lines',
+            type=int,
+            action='append',
+            help='Item lines per invoice (repeatable, default: 5 and 500)',
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=50,
+            help='Invoices rendered per renderer and size (default: 50)',
+        )
+
+    def handle(self, *args, **options):
+        sizes = options['lines'] or [5, 500]
+        rounds = options['rounds']
+        self.stdout.write(f'📄 Rendering {rounds} invoices per renderer and size')
+
+        for lines in sizes:
+            data = sample_data(lines)
+            results = {}
+            for name, path in RENDERERS.items():
+                render = import_string(path)
+                render(data, BytesIO())  # warm up fonts and cached styles
+
+                started = time.perf_counter()
+                for _ in range(rounds):
+                    output = BytesIO()
+                    pages = render(data, output)
+                elapsed = time.perf_counter() - started
+                results[name] = elapsed
+
+                self.stdout.write(
+                    f'   {lines:>5} lines  {name:<9} {elapsed / rounds * 1000:8.2f} ms/invoice, '
+                    f'{pages} pages, {len(output.getvalue()) / 1024:.1f} KiB'
+                )
+
+            self.stdout.write(
+                f'   {lines:>5} lines  canvas is {results["platypus"] / results["canvas"]:.1f}x faster'
+            )
+
+        self.stdout.write(self.style.SUCCESS('✓ Done'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from orders.reservations import recount_reserved
+
+
+class Command(BaseCommand):
+    help = 'Recompute the reserved units on every product from its checkout holds'
+
+    def handle(self, *args, **options):
+        drifted = recount_reserved()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Recounted reserved stock ({drifted} products had drifted)'
+        ))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.reservations import SWEEP_BATCH_SIZE, release_expired
+
+
+class Command(BaseCommand):
+    help = 'Release checkout stock reservations whose TTL has run out (run every minute from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SWEEP_BATCH_SIZE,
+            help=f'Reservations released per transaction (default: {SWEEP_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        released = release_expired(batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Released {released} expired reservations in {time.monotonic() - started:.2f}s'
+        ))
@@ -0,0 +1,14 @@
+class CartMiddleware:
+    """Let the cart storage write its cookie onto the outgoing response"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        storage = getattr(request, "_cart_storage", None)
+        if storage is not None:
+            storage.commit(response)
+
+        return response
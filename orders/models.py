@@ -43,4 +43,68 @@ class OrderItem(models.Model):
 
     @property
     def total_price(self):
-        return self.price * self.quantity
\ No newline at end of file
+        return self.price * self.quantity
+
+class CartItem(models.Model):
+    """A line of a logged-in user's cart, kept across sessions and devices"""
+    user = models.ForeignKey(User, related_name="cart_items", on_delete=models.CASCADE)
+    product = models.ForeignKey("products.Product", on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "product"], name="cartitem_user_product_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.product_id} x {self.quantity}"
+
+
+class StockReservation(models.Model):
+    """
+    Units of a product held for a user's checkout until `expires_at`. The
+    held quantity is also counted in Product.reserved, so available stock
+    is one column read and holds are taken with a conditional UPDATE.
+    """
+    user = models.ForeignKey(User, related_name="stock_reservations", on_delete=models.CASCADE)
+    product = models.ForeignKey(
+        "products.Product",
+        related_name="reservations",
+        on_delete=models.CASCADE
+    )
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["expires_at"], name="reservation_expiry_idx"),
+            models.Index(fields=["user", "expires_at"], name="reservation_user_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} holds {self.product_id} x {self.quantity}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    A checkout submission already handled for a user, so a double-click or
+    retried POST with the same key returns the first order instead of
+    placing another. Rows are purged after IDEMPOTENCY_KEY_TTL.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=64)
+    order = models.ForeignKey(Order, blank=True, null=True, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="idempotency_user_key_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["created_at"], name="idempotency_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.key}"
@@ -0,0 +1,192 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, PositiveIntegerField, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from products.models import Product
+from .models import StockReservation
+
+SWEEP_BATCH_SIZE = 1000
+
+
+def _ttl():
+    return timedelta(seconds=getattr(settings, "STOCK_RESERVATION_TTL", 600))
+
+
+def _hold(product_id, qty):
+    """
+    Reserve `qty` units with one conditional UPDATE. The row is locked only
+    for this statement, and concurrent holds can never push reserved above
+    stock, so hot products don't pile up behind long-lived locks.
+    """
+    return Product.objects.filter(
+        id=product_id,
+        stock__gte=F("reserved") + qty,
+    ).update(reserved=F("reserved") + qty)
+
+
+def release_reservations(reservations):
+    """Delete the given holds and hand their units back. Returns how many were released"""
+    with transaction.atomic():
+        # Skip holds another worker is already releasing so each is
+        # returned exactly once
+        rows = list(
+            reservations.select_for_update(skip_locked=True)
+            .values_list("id", "product_id", "quantity")
+        )
+        if not rows:
+            return 0
+
+        StockReservation.objects.filter(id__in=[row[0] for row in rows]).delete()
+
+        totals = defaultdict(int)
+        for _, product_id, qty in rows:
+            totals[product_id] += qty
+
+        # Lock the products in id order, the same order holds are taken in,
+        # so a sweep and a checkout can't deadlock
+        list(
+            Product.objects.select_for_update()
+            .filter(id__in=totals)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        # Clamped at zero: if `reserved` has drifted low (see recount_reserved)
+        # the release must still go through rather than trip the column's
+        # CHECK constraint and wedge checkout and the sweep
+        Product.objects.filter(id__in=totals).update(
+            reserved=Case(
+                *[
+                    When(id=product_id, then=Greatest(F("reserved") - qty, 0))
+                    for product_id, qty in totals.items()
+                ],
+                default=F("reserved"),
+                output_field=PositiveIntegerField(),
+            )
+        )
+
+        return len(rows)
+
+
+def held_by(user, now=None):
+    """{product_id: quantity} of the user's live holds"""
+    now = now or timezone.now()
+    held = defaultdict(int)
+    for product_id, qty in StockReservation.objects.filter(
+        user=user, expires_at__gt=now
+    ).values_list("product_id", "quantity"):
+        held[product_id] += qty
+    return dict(held)
+
+
+def release(user):
+    """Give back every hold the user has, live or expired"""
+    return release_reservations(StockReservation.objects.filter(user=user))
+
+
+def release_expired(product_ids=None, batch_size=SWEEP_BATCH_SIZE):
+    """Release holds whose TTL has run out, in batches. Returns how many were released"""
+    now = timezone.now()
+    expired = StockReservation.objects.filter(expires_at__lte=now)
+    if product_ids is not None:
+        expired = expired.filter(product_id__in=product_ids)
+
+    released = 0
+    while True:
+        ids = list(expired.order_by("expires_at").values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return released
+
+        count = release_reservations(StockReservation.objects.filter(id__in=ids, expires_at__lte=now))
+        released += count
+        if not count:
+            # Everything left is being released by another worker
+            return released
+
+
+def reserve(user, quantities):
+    """
+    Hold `quantities` ({product_id: qty}) for the user until the TTL runs
+    out, replacing the holds they had. Holding the same quantities again
+    just extends them.
+
+    Returns {product_id: available} for the lines that couldn't be held.
+    In that case the whole call is rolled back: none of `quantities` is
+    held and the user keeps the holds they had before.
+    """
+    now = timezone.now()
+    expires_at = now + _ttl()
+    quantities = {int(product_id): qty for product_id, qty in quantities.items() if qty > 0}
+
+    with transaction.atomic():
+        if held_by(user, now) == quantities:
+            StockReservation.objects.filter(user=user, expires_at__gt=now).update(expires_at=expires_at)
+            return {}
+
+        release(user)
+
+        short = []
+        # Take holds in id order so concurrent checkouts lock rows in the
+        # same order and can't deadlock
+        for product_id in sorted(quantities):
+            qty = quantities[product_id]
+            if _hold(product_id, qty):
+                continue
+
+            # Expired holds the sweeper hasn't reached yet may be in the way
+            if release_expired([product_id]) and _hold(product_id, qty):
+                continue
+
+            short.append(product_id)
+
+        if short:
+            available = {
+                product.id: product.available_stock
+                for product in Product.objects.filter(id__in=short).only("id", "stock", "reserved")
+            }
+            transaction.set_rollback(True)
+            return {product_id: available.get(product_id, 0) for product_id in short}
+
+        StockReservation.objects.bulk_create([
+            StockReservation(user=user, product_id=product_id, quantity=qty, expires_at=expires_at)
+            for product_id, qty in quantities.items()
+        ])
+
+    return {}
+
+
+def recount_reserved():
+    """
+    Recompute Product.reserved from the holds that exist, live or expired
+    (expired holds stay counted until the sweep releases them). Repairs
+    drift from holds removed without release_reservations, e.g. by a
+    cascading user delete. Returns how many products had drifted.
+    """
+    totals = (
+        StockReservation.objects.filter(product=OuterRef("pk"))
+        .order_by()
+        .values("product")
+        .annotate(total=Sum("quantity"))
+        .values("total")
+    )
+    held = Coalesce(Subquery(totals, output_field=PositiveIntegerField()), Value(0))
+
+    with transaction.atomic():
+        # Lock in id order like holds and releases do; while the rows are
+        # locked no hold can change them between the count and the write
+        drifted = list(
+            Product.objects.select_for_update()
+            .filter(Q(reserved__gt=0) | Q(id__in=StockReservation.objects.values("product_id")))
+            .annotate(held=held)
+            .exclude(reserved=F("held"))
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        if drifted:
+            Product.objects.filter(id__in=drifted).update(reserved=held)
+
+    return len(drifted)
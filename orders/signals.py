@@ -0,0 +1,20 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cart import merge_anonymous_cart
+from .models import Order
+from .stats import invalidate_order_stats
+
+
+@receiver(user_logged_in)
+def merge_cart_on_login(sender, request, user, **kwargs):
+    if request is not None:
+        merge_anonymous_cart(request, user)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def order_changed(sender, instance, **kwargs):
+    # Bulk updates skip this; their callers invalidate the stats themselves
+    invalidate_order_stats([instance.user_id])
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Q
+
+from products.cache import is_shared
+from .models import Order
+
+KEY = "order_stats:{}"
+
+
+def _alias():
+    return getattr(settings, "ORDER_STATS_CACHE_ALIAS", "default")
+
+
+def _cache():
+    return caches[_alias()]
+
+
+def _timeout():
+    # Orders are paid by other workers, webhooks and reconcile; their
+    # invalidations only reach a cache every process shares
+    if not is_shared(_alias()):
+        return 0
+    return getattr(settings, "ORDER_STATS_TIMEOUT", 300)
+
+
+def order_stats(user):
+    """
+    {"total", "paid", "pending"} order counts for a user, from one
+    conditional aggregate. Cached per user when the cache is shared and
+    ORDER_STATS_TIMEOUT isn't 0.
+    """
+    timeout = _timeout()
+    if timeout:
+        stats = _cache().get(KEY.format(user.pk))
+        if stats is not None:
+            return stats
+
+    stats = Order.objects.filter(user=user).aggregate(
+        total=Count("id"),
+        paid=Count("id", filter=Q(status="paid")),
+        pending=Count("id", filter=Q(status="pending")),
+    )
+    if timeout:
+        _cache().set(KEY.format(user.pk), stats, timeout)
+    return stats
+
+
+def invalidate_order_stats(user_ids):
+    """
+    Forget the cached counts of these users. Deferred until the transaction
+    commits so a concurrent dashboard can't cache the old counts again.
+    """
+    keys = [KEY.format(user_id) for user_id in set(user_ids)]
+    if keys and _timeout():
+        transaction.on_commit(lambda: _cache().delete_many(keys))
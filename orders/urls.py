@@ -1,10 +1,11 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path("add/<int:product_id>/", views.add_to_cart, name="add_to_cart"),
     path("remove/<int:product_id>/", views.remove_from_cart, name="remove_from_cart"),
     path("cart/", views.cart_detail, name="cart_detail"),
     path("checkout/", views.checkout, name="checkout"),
+    path("api/cart/", api.cart_api, name="cart_api"),
     path("invoice/<int:order_id>/", views.download_invoice, name="download_invoice"),
 ]
\ No newline at end of file
@@ -1,10 +1,24 @@
+import re
+import uuid
+
 from django.shortcuts import redirect, render, get_object_or_404
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 
 from products.models import Product
 from .cart import Cart
-from .models import Order, OrderItem
-from .invoice import generate_invoice_pdf
+from .cart_storage import CartFull
+from . import reservations
+from .checkout import AlreadySubmitted, OutOfStock, place_order, submitted_order_id
+from .models import Order
+from . import invoice
+
+# Single byte range of an invoice download, e.g. "bytes=1000-" to resume
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+RANGE_CHUNK_SIZE = 64 * 1024
 
 
 def add_to_cart(request, product_id):
@@ -13,7 +27,11 @@ def add_to_cart(request, product_id):
     # is provided (or HTTP_REFERER exists) we redirect back there so
     # the UX can remain on the product list; otherwise go to cart.
     quantity = int(request.POST.get('quantity', 1)) if request.method == 'POST' else 1
-    cart.add(product_id, quantity)
+    try:
+        cart.add(product_id, quantity)
+    except CartFull as e:
+        messages.error(request, str(e))
+        return redirect("cart_detail")
 
     # Prefer explicit next parameter, then referer, else cart
     next_url = request.POST.get('next') or request.GET.get('next') or request.META.get('HTTP_REFERER')
@@ -39,10 +57,24 @@ def cart_detail(request):
     })
 
 
+def _idempotency_key(request):
+    """Client-supplied key for this checkout submission, from the header or the form"""
+    key = request.headers.get("Idempotency-Key") or request.POST.get("idempotency_key", "")
+    key = key.strip()
+    if key and len(key) <= 64 and all(c.isalnum() or c in "-_" for c in key):
+        return key
+    return None
+
+
+def _short_stock_messages(cart, short):
+    names = {item.product.id: item.product.name for item in cart.items()}
+    for product_id, available in short.items():
+        yield f'Only {available} of {names.get(product_id, "a product")} left; please update your cart.'
+
+
 @login_required
 def checkout(request):
     from accounts.models import Address
-    from django.contrib import messages
     
     cart = Cart(request)
     
@@ -50,6 +82,13 @@ def checkout(request):
     address = Address.objects.filter(user=request.user).first()
     
     if request.method == "POST":
+        # A repeated submission goes straight to the order it already placed
+        idempotency_key = _idempotency_key(request)
+        if idempotency_key:
+            order_id = submitted_order_id(request.user, idempotency_key)
+            if order_id:
+                return redirect("start_payment", order_id=order_id)
+
         # Validate that address exists before creating order
         if not address:
             messages.error(request, 'Please add a shipping address before checkout.')
@@ -59,36 +98,112 @@ def checkout(request):
             messages.error(request, 'Your cart is empty.')
             return redirect('cart_detail')
 
-        order = Order.objects.create(
-            user=request.user,
-            total_price=cart.get_total_price()
-        )
-
-        for item in cart.items():
-            OrderItem.objects.create(
-                order=order,
-                product=item["product"],
-                price=item["price"],
-                quantity=item["quantity"]
-            )
-
-            # Reduce stock
-            product = item["product"]
-            product.stock -= item["quantity"]
-            product.save()
+        try:
+            order = place_order(request.user, cart.items(), idempotency_key)
+        except AlreadySubmitted as e:
+            if e.order_id:
+                return redirect("start_payment", order_id=e.order_id)
+            return redirect('cart_detail')
+        except OutOfStock as e:
+            for message in _short_stock_messages(cart, e.short):
+                messages.error(request, message)
+            if not e.short:
+                messages.error(request, 'Some items just sold out; please review your cart.')
+            return redirect('cart_detail')
 
         cart.clear()
 
         return redirect("start_payment", order_id=order.id)
 
+    # Hold the cart's stock while the user completes checkout
+    if address and cart.cart:
+        short = reservations.reserve(request.user, cart.cart)
+        cart.invalidate()
+        for message in _short_stock_messages(cart, short):
+            messages.warning(request, message)
+
     return render(request, "orders/checkout.html", {
         "cart": cart,
-        "address": address
+        "address": address,
+        # Sent back with the form so a double submit places one order
+        "idempotency_key": uuid.uuid4().hex,
     })
 
 
+def _byte_range(request, etag, size):
+    """
+    (first, last) byte of a single-range request, "unsatisfiable", or None
+    to send the whole file: no Range, several ranges, an invalid range
+    (last before first), or an If-Range for an older version of the file.
+    """
+    match = _RANGE.match(request.headers.get("Range", "").strip())
+    if not match or match[1] == match[2] == "":
+        return None
+    if request.headers.get("If-Range", etag) != etag:
+        return None
+
+    if match[1] == "":
+        # Suffix range: the last N bytes
+        length = int(match[2])
+        if length == 0:
+            return "unsatisfiable"
+        return max(size - length, 0), size - 1
+
+    start = int(match[1])
+    if match[2] and int(match[2]) < start:
+        # Not a valid range at all, so RFC 9110 says to ignore the header
+        return None
+    if start >= size:
+        return "unsatisfiable"
+    end = min(int(match[2]), size - 1) if match[2] else size - 1
+    return start, end
+
+
+def _read_range(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(RANGE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
 @login_required
 def download_invoice(request, order_id):
-    """Download order invoice as PDF"""
-    order = get_object_or_404(Order, id=order_id, user=request.user)
-    return generate_invoice_pdf(order)
\ No newline at end of file
+    """
+    Download order invoice as PDF, rendered once and then served from
+    storage. Supports single byte ranges so large invoices can resume.
+    """
+    order = get_object_or_404(Order.objects.select_related("user__address"), id=order_id, user=request.user)
+    name, digest = invoice.get_invoice(order)
+    etag = quote_etag(digest)
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        file, size = invoice.open_invoice(name)
+        byte_range = _byte_range(request, etag, size)
+        if byte_range == "unsatisfiable":
+            file.close()
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+        elif byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _read_range(file, start, end - start + 1),
+                status=206,
+                content_type="application/pdf",
+            )
+            response["Content-Length"] = str(end - start + 1)
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        else:
+            # FileResponse streams the stored file and sets Content-Length
+            response = FileResponse(file, content_type="application/pdf")
+        response["Content-Disposition"] = f'attachment; filename="invoice_order_{order.id}.pdf"'
+        response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
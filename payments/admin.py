@@ -1,3 +1,33 @@
 from django.contrib import admin
+from django.utils import timezone
 
-# Register your models here.
+from .models import OutboxMessage, WebhookEvent
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "attempts", "next_attempt_at", "created_at", "sent_at")
+    list_filter = ("status", "kind")
+    readonly_fields = ("created_at", "sent_at", "last_error")
+    actions = ["requeue"]
+
+    @admin.action(description="Requeue selected messages")
+    def requeue(self, request, queryset):
+        count = queryset.exclude(status="sent").update(
+            status="pending", attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f"{count} messages requeued")
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ("event_id", "event_type", "status", "received_at", "processed_at")
+    list_filter = ("status", "event_type")
+    search_fields = ("event_id",)
+    readonly_fields = ("event_id", "event_type", "payload", "received_at", "processed_at", "error")
+    actions = ["reprocess"]
+
+    @admin.action(description="Reprocess selected events")
+    def reprocess(self, request, queryset):
+        count = queryset.exclude(status="processed").update(status="pending", error="")
+        self.message_user(request, f"{count} events queued for processing")
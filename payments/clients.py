@@ -0,0 +1,207 @@
+"""
+Shared outbound HTTP for the payment and email gateways.
+
+Each gateway is a `Service`: one keep-alive connection pool per process,
+explicit (connect, read) timeouts, a circuit breaker that fails fast
+while the provider is down, and per-call latency stats.
+"""
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+import razorpay
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Calls slower than this are logged as warnings
+SLOW_CALL = 2.0
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a provider that has been failing"""
+
+    def __init__(self, service):
+        self.service = service
+        super().__init__(f"{service} is unavailable, not calling it")
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures. Once `reset_timeout`
+    seconds have passed a single trial call is let through: success
+    closes the breaker, failure keeps it open for another period.
+    """
+
+    def __init__(self, name, threshold, reset_timeout):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if not self.probing and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.probing = True
+                return True
+            return False
+
+    def success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                logger.info(f"{self.name} circuit closed")
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or (self.opened_at is None and self.failures >= self.threshold):
+                if not self.probing:
+                    logger.warning(f"{self.name} circuit opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+                self.probing = False
+
+
+class Stats:
+    """Per-operation call counts and latency, kept in process memory"""
+
+    def __init__(self):
+        self.calls = defaultdict(lambda: {"count": 0, "failures": 0, "total": 0.0, "max": 0.0})
+        self.lock = threading.Lock()
+
+    def record(self, key, elapsed, failed):
+        with self.lock:
+            entry = self.calls[key]
+            entry["count"] += 1
+            entry["failures"] += failed
+            entry["total"] += elapsed
+            entry["max"] = max(entry["max"], elapsed)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                key: {**entry, "avg": entry["total"] / entry["count"]}
+                for key, entry in self.calls.items()
+            }
+
+
+stats = Stats()
+
+
+def _is_outage(error):
+    """Client errors (4xx) mean the provider is up; everything else counts against it"""
+    status = getattr(error, "status", None)
+    return not (status and 400 <= status < 500 and status != 429)
+
+
+class Service:
+    def __init__(self, name, timeout):
+        self.name = name
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(
+            name,
+            threshold=getattr(settings, "GATEWAY_BREAKER_THRESHOLD", 5),
+            reset_timeout=getattr(settings, "GATEWAY_BREAKER_RESET", 30),
+        )
+
+    def call(self, operation, fn, *args, **kwargs):
+        """
+        Run `fn` under the breaker and record how long it took. A response
+        with a 5xx/429 status counts as a failure, as does any exception
+        that isn't a client error. Raises CircuitOpen without calling `fn`
+        while the breaker is open.
+        """
+        if not self.breaker.allow():
+            stats.record((self.name, operation), 0.0, True)
+            raise CircuitOpen(self.name)
+
+        failed = True
+        start = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+            status = getattr(result, "status_code", None)
+            failed = bool(status and (status >= 500 or status == 429))
+            return result
+        except Exception as e:
+            failed = _is_outage(e)
+            raise
+        finally:
+            elapsed = time.monotonic() - start
+            if failed:
+                self.breaker.failure()
+            else:
+                self.breaker.success()
+            stats.record((self.name, operation), elapsed, failed)
+
+            message = f"{self.name} {operation} {'failed' if failed else 'ok'} in {elapsed * 1000:.0f}ms"
+            if elapsed >= SLOW_CALL:
+                logger.warning(message)
+            else:
+                logger.debug(message)
+
+
+# Gateway ids in URLs (pay_..., order_...) are folded so stats group by endpoint
+_ID = re.compile(r"/[a-z]+_[A-Za-z0-9]{8,}")
+
+
+class ServiceSession(requests.Session):
+    """
+    A requests session that routes every call through a Service. Only
+    idempotent methods are retried on read errors and 502/503/504;
+    connection failures are retried for any method since nothing was sent.
+    """
+
+    def __init__(self, service):
+        super().__init__()
+        self.service = service
+
+        retry = Retry(
+            total=getattr(settings, "GATEWAY_RETRIES", 2),
+            backoff_factor=0.2,
+            backoff_jitter=0.2,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False,
+        )
+        pool_size = getattr(settings, "GATEWAY_POOL_SIZE", 10)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.service.timeout)
+        operation = f"{method.upper()} {_ID.sub('/{id}', urlsplit(url).path)}"
+        return self.service.call(operation, super().request, method, url, **kwargs)
+
+
+@lru_cache(maxsize=1)
+def get_razorpay_client():
+    """One Razorpay client per process, sharing its connection pool across requests"""
+    service = Service("razorpay", settings.RAZORPAY_TIMEOUT)
+    options = {}
+    if getattr(settings, "RAZORPAY_BASE_URL", None):
+        options["base_url"] = settings.RAZORPAY_BASE_URL
+    return razorpay.Client(
+        session=ServiceSession(service),
+        auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET),
+        **options,
+    )
+
+
+@lru_cache(maxsize=1)
+def brevo():
+    return Service("brevo", settings.BREVO_TIMEOUT)
@@ -4,6 +4,9 @@ from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 import logging
+from functools import lru_cache
+
+from . import clients
 
 logger = logging.getLogger(__name__)
 
@@ -20,55 +23,87 @@ else:
     logger.info(f"✓ Using sender email: {settings.DEFAULT_FROM_EMAIL}")
 
 
+SENDER = {
+    "name": "Ecommerce Support",
+    "email": "priyanshkurmi2004@gmail.com"
+}
+
+
+@lru_cache(maxsize=1)
 def get_brevo_client():
+    """One API client per process, so its connection pool is reused between sends"""
     if not settings.BREVO_API_KEY:
         logger.error("BREVO_API_KEY is not configured in settings")
         raise ValueError("BREVO_API_KEY environment variable is missing")
     
     configuration = sib_api_v3_sdk.Configuration()
     configuration.api_key['api-key'] = settings.BREVO_API_KEY
+    configuration.connection_pool_maxsize = getattr(settings, "GATEWAY_POOL_SIZE", 10)
     return sib_api_v3_sdk.TransactionalEmailsApi(
         sib_api_v3_sdk.ApiClient(configuration)
     )
 
 
-def send_order_confirmation_email(order):
-    try:
-        api_instance = get_brevo_client()
+def _message(user, subject, template, context):
+    html_content = render_to_string(template, context)
+
+    return {
+        "to": [{
+            "email": user.email,
+            "name": user.username
+        }],
+        "sender": SENDER,
+        "subject": subject,
+        "html_content": html_content,
+        "text_content": strip_tags(html_content),
+    }
 
-        subject = f"Order Confirmation #{order.id}"
 
-        context = {
+def build_order_confirmation(order):
+    return _message(
+        order.user,
+        f"Order Confirmation #{order.id}",
+        "emails/order_confirmation.html",
+        {
             "order": order,
             "user": order.user,
-        }
+        },
+    )
 
-        html_content = render_to_string(
-            "emails/order_confirmation.html",
-            context
-        )
 
-        text_content = strip_tags(html_content)
+def build_payment_confirmation(payment):
+    order = payment.order
 
-        sender = {
-            "name": "Ecommerce Support",
-            "email": "priyanshkurmi2004@gmail.com"
-        }
+    return _message(
+        order.user,
+        f"Payment Confirmed #{order.id}",
+        "emails/payment_confirmation.html",
+        {
+            "order": order,
+            "payment": payment,
+            "user": order.user,
+        },
+    )
 
-        to = [{
-            "email": order.user.email,
-            "name": order.user.username
-        }]
 
-        send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
-            to=to,
-            sender=sender,
-            subject=subject,
-            html_content=html_content,
-            text_content=text_content
-        )
+def send_email(message):
+    """
+    Send a message built by one of the build_* functions; raises
+    ApiException on failure, or CircuitOpen while Brevo is down. Sends
+    aren't idempotent, so they are never retried here.
+    """
+    service = clients.brevo()
+    service.call(
+        "send_transac_email",
+        get_brevo_client().send_transac_email,
+        sib_api_v3_sdk.SendSmtpEmail(**message),
+        _request_timeout=service.timeout,
+    )
+
 
-        api_instance.send_transac_email(send_smtp_email)
+def send_order_confirmation_email(order):
+    try:
+        send_email(build_order_confirmation(order))
 
         logger.info(f"Order email sent for order {order.id}")
         return True
@@ -82,45 +117,8 @@ def send_order_confirmation_email(order):
 
 
 def send_payment_confirmation_email(payment):
-    order = payment.order
-
     try:
-        api_instance = get_brevo_client()
-
-        subject = f"Payment Confirmed #{order.id}"
-
-        context = {
-            "order": order,
-            "payment": payment,
-            "user": order.user,
-        }
-
-        html_content = render_to_string(
-            "emails/payment_confirmation.html",
-            context
-        )
-
-        text_content = strip_tags(html_content)
-
-        sender = {
-            "name": "Ecommerce Support",
-            "email": "priyanshkurmi2004@gmail.com"
-        }
-
-        to = [{
-            "email": order.user.email,
-            "name": order.user.username
-        }]
-
-        send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
-            to=to,
-            sender=sender,
-            subject=subject,
-            html_content=html_content,
-            text_content=text_content
-        )
-
-        api_instance.send_transac_email(send_smtp_email)
+        send_email(build_payment_confirmation(payment))
 
         logger.info(f"Payment email sent for payment {payment.id}")
         return True
@@ -130,4 +128,4 @@ def send_payment_confirmation_email(payment):
         return False
     except Exception as e:
         logger.error(f"Unexpected error sending payment email: {type(e).__name__} - {str(e)}", exc_info=True)
-        return False
\ No newline at end of file
+        return False
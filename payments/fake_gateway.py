@@ -0,0 +1,157 @@
+"""
+A local stand-in for the parts of the Razorpay orders API the site uses,
+so payment code can be exercised without credentials or network access.
+Point RAZORPAY_BASE_URL at it, e.g. with `manage.py fake_razorpay`.
+"""
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_ORDER_PAYMENTS = re.compile(r"^/v1/orders/([^/]+)/payments/?$")
+_ORDER = re.compile(r"^/v1/orders/([^/]+)/?$")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _outage(self):
+        """Answer with a 503 for an `error_rate` share of requests"""
+        if random.random() < self.server.error_rate:
+            self._send(503, {"error": {"code": "SERVER_ERROR", "description": "Service unavailable"}})
+            return True
+        return False
+
+    def _not_found(self):
+        self._send(400, {"error": {"code": "BAD_REQUEST_ERROR", "description": "The id provided does not exist"}})
+
+    def do_GET(self):
+        gateway = self.server
+        time.sleep(gateway.latency)
+        if self._outage():
+            return
+
+        match = _ORDER_PAYMENTS.match(self.path.split("?")[0])
+        if match:
+            if match.group(1) not in gateway.orders:
+                return self._not_found()
+            items = gateway.payments.get(match.group(1), [])
+            return self._send(200, {"entity": "collection", "count": len(items), "items": items})
+
+        match = _ORDER.match(self.path.split("?")[0])
+        if match and match.group(1) in gateway.orders:
+            return self._send(200, gateway.orders[match.group(1)])
+        self._not_found()
+
+    def do_POST(self):
+        gateway = self.server
+        time.sleep(gateway.latency)
+        # Read the body first so the kept-alive connection stays in step
+        data = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if self._outage():
+            return
+
+        if self.path.rstrip("/") != "/v1/orders":
+            return self._not_found()
+        order = gateway.add_order(amount=data.get("amount"), receipt=data.get("receipt"))
+        self._send(200, order)
+
+
+class FakeRazorpay(ThreadingHTTPServer):
+    """
+    Serves orders and their payments from memory. Use as a context
+    manager to run it on a background thread:
+
+        with FakeRazorpay(latency=0.05, error_rate=0.1) as gateway:
+            gateway.add_order("order_1", amount=50000, captured=True)
+            ... settings.RAZORPAY_BASE_URL = gateway.url ...
+    """
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0):
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.orders = {}
+        self.payments = {}
+        self._thread = None
+
+    def handle_error(self, request, client_address):
+        # Clients that time out hang up mid-response; that's expected here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_order(self, order_id=None, amount=None, receipt=None, captured=None):
+        """
+        Register a gateway order. `captured=True` gives it a captured
+        payment, `False` a failed one, None no payment attempt at all.
+        """
+        order_id = order_id or f"order_{uuid.uuid4().hex[:14]}"
+        self.orders[order_id] = {
+            "id": order_id,
+            "entity": "order",
+            "amount": amount,
+            "currency": "INR",
+            "receipt": receipt,
+            "status": "paid" if captured else ("attempted" if captured is False else "created"),
+        }
+        if captured is not None:
+            self.payments[order_id] = [{
+                "id": f"pay_{uuid.uuid4().hex[:14]}",
+                "entity": "payment",
+                "order_id": order_id,
+                "amount": amount,
+                "currency": "INR",
+                "status": "captured" if captured else "failed",
+            }]
+        return self.orders[order_id]
+
+    def add_pending_orders(self, capture_rate=1.0):
+        """
+        Mirror the site's unpaid orders, capturing a deterministic
+        `capture_rate` share of them so reconciliation has work to do.
+        """
+        from orders.models import Order
+
+        rows = (
+            Order.objects.filter(is_paid=False, razorpay_order_id__isnull=False)
+            .exclude(razorpay_order_id="")
+            .values_list("razorpay_order_id", "total_price")
+            .iterator(chunk_size=2000)
+        )
+        count = 0
+        for razorpay_order_id, total_price in rows:
+            captured = zlib.crc32(razorpay_order_id.encode()) % 1000 < capture_rate * 1000
+            self.add_order(razorpay_order_id, amount=int(total_price * 100), captured=captured)
+            count += 1
+        return count
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.fake_gateway import FakeRazorpay
+
+
+class Command(BaseCommand):
+    help = 'Run a local fake Razorpay API that mirrors pending orders (set RAZORPAY_BASE_URL to use it)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8765,
+            help='Port to listen on (default: 8765)',
+        )
+        parser.add_argument(
+            '--capture-rate',
+            type=float,
+            default=0.9,
+            help='Share of pending orders reported as paid (default: 0.9)',
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.05,
+            help='Seconds added to every response (default: 0.05)',
+        )
+        parser.add_argument(
+            '--error-rate',
+            type=float,
+            default=0.0,
+            help='Share of requests answered with a 503 (default: 0)',
+        )
+
+    def handle(self, *args, **options):
+        with FakeRazorpay(
+            port=options['port'],
+            latency=options['latency'],
+            error_rate=options['error_rate'],
+        ) as gateway:
+            count = gateway.add_pending_orders(options['capture_rate'])
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Fake Razorpay serving {count} orders at {gateway.url}'
+            ))
+            self.stdout.write(f'   RAZORPAY_BASE_URL={gateway.url}')
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                pass
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from payments import webhooks
+
+
+class Command(BaseCommand):
+    help = 'Apply stored Razorpay webhook events in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Events applied per transaction (default: 200)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep when no events are pending (default: 2)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Apply what is pending now and exit instead of polling forever',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        self.stdout.write('🔔 Webhook worker started')
+
+        try:
+            while True:
+                close_old_connections()
+                handled = webhooks.process_batch(options['batch_size'])
+                total += handled
+
+                if handled:
+                    self.stdout.write(f'   applied {handled} events')
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Applied {total} webhook events'))
@@ -0,0 +1,74 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from payments import reconcile
+from payments.clients import CircuitOpen
+
+
+class Command(BaseCommand):
+    help = 'Find pending orders that were paid at the gateway and mark them paid'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=reconcile.BATCH_SIZE,
+            help=f'Orders looked up and updated per batch (default: {reconcile.BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.GATEWAY_POOL_SIZE,
+            help='Concurrent gateway lookups (default: GATEWAY_POOL_SIZE, one per pooled connection)',
+        )
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=15,
+            help='Only check orders created at least this many minutes ago (default: 15)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change without writing anything',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        totals = Counter()
+        mode = ' (dry run)' if options['dry_run'] else ''
+        self.stdout.write(f'🔄 Reconciling pending payments{mode}...')
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            batches = reconcile.reconcile(
+                executor,
+                batch_size=options['batch_size'],
+                older_than=timedelta(minutes=options['older_than']),
+                dry_run=options['dry_run'],
+            )
+            try:
+                for counts in batches:
+                    totals.update(counts)
+                    self.stdout.write(
+                        f'   {totals["checked"]} checked, {totals["paid"]} paid'
+                    )
+            except CircuitOpen as e:
+                raise CommandError(f'Stopped after {totals["checked"]} orders: {e}')
+
+        elapsed = time.monotonic() - started
+        verb = 'would be marked paid' if options['dry_run'] else 'marked paid'
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {totals["checked"]} orders checked in {elapsed:.2f}s: '
+            f'{totals["paid"]} {verb}, {totals["failed"]} failed at the gateway, '
+            f'{totals["unpaid"]} still unpaid'
+        ))
+        if totals['mismatched'] or totals['errors']:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️ {totals["mismatched"]} amount/order mismatches, '
+                f'{totals["errors"]} lookups failed (see the log)'
+            ))
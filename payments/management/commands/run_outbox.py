@@ -0,0 +1,61 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from payments import outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued emails from the outbox, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Messages claimed per batch (default: 50)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Concurrent sends (default: 8)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep when the outbox is empty (default: 2)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain what is due now and exit instead of polling forever',
+        )
+
+    def handle(self, *args, **options):
+        transport = outbox.get_transport()
+        totals = [0, 0, 0]
+        self.stdout.write(f'📬 Outbox worker started ({type(transport).__name__}, {options["workers"]} workers)')
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            try:
+                while True:
+                    close_old_connections()
+                    sent, retried, dead = outbox.process_batch(transport, executor, options['batch_size'])
+                    totals = [t + n for t, n in zip(totals, (sent, retried, dead))]
+
+                    if sent or retried or dead:
+                        self.stdout.write(f'   sent {sent}, retrying {retried}, dead-lettered {dead}')
+                    elif options['once']:
+                        break
+                    else:
+                        time.sleep(options['poll_interval'])
+            except KeyboardInterrupt:
+                pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Sent {totals[0]}, retrying {totals[1]}, dead-lettered {totals[2]}'
+        ))
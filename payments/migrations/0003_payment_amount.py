@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_alter_payment_options_payment_paid_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='amount',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
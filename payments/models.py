@@ -6,6 +6,8 @@ from django.utils import timezone
 class Payment(models.Model):
     order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name='payment')
     razorpay_order_id = models.CharField(max_length=200)
+    # Amount in paise the gateway order was created for
+    amount = models.PositiveIntegerField(blank=True, null=True)
     razorpay_payment_id = models.CharField(max_length=200, blank=True, null=True)
     razorpay_signature = models.CharField(max_length=500, blank=True, null=True)
     status = models.CharField(max_length=20, default="created")
@@ -16,4 +18,62 @@ class Payment(models.Model):
         return f"Payment for Order {self.order.id}"
 
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+
+class OutboxMessage(models.Model):
+    """
+    An email to send, written in the same transaction as the change it
+    reports and delivered later by `manage.py run_outbox`.
+    """
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("sent", "Sent"),
+        ("dead", "Dead"),
+    )
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+
+
+class WebhookEvent(models.Model):
+    """
+    A raw Razorpay webhook delivery. The unique event id makes gateway
+    retries of the same event no-ops; `manage.py process_webhooks` applies
+    pending events in batches.
+    """
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("processed", "Processed"),
+        ("ignored", "Ignored"),
+        ("failed", "Failed"),
+    )
+
+    event_id = models.CharField(max_length=100, unique=True)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "received_at"], name="webhook_pending_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.event_id} ({self.status})"
@@ -0,0 +1,185 @@
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from sib_api_v3_sdk.rest import ApiException
+
+from orders import invoice
+from orders.models import Order
+from . import email
+from .models import OutboxMessage, Payment
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 30  # seconds before the first retry, doubled after each failure
+BACKOFF_MAX = 60 * 60
+# A claimed message becomes due again after this long, so a worker that
+# dies mid-batch doesn't lose it
+LEASE = timedelta(minutes=5)
+
+
+class PermanentError(Exception):
+    """A delivery failure that retrying won't fix"""
+
+
+def _prerender_invoice(order_id):
+    try:
+        invoice.prerender(order_id)
+    except Exception:
+        # The invoice is rendered on first download instead
+        logger.exception(f"Could not pre-render invoice for order {order_id}")
+
+
+def _order_confirmation(payload):
+    # Rendering a long invoice takes up to a second, so it happens here in
+    # the worker rather than in the payment callback; the customer's first
+    # download then hits the cached PDF.
+    _prerender_invoice(payload["order_id"])
+    return email.build_order_confirmation(
+        Order.objects.select_related("user").get(id=payload["order_id"])
+    )
+
+
+def _payment_confirmation(payload):
+    return email.build_payment_confirmation(
+        Payment.objects.select_related("order__user").get(id=payload["payment_id"])
+    )
+
+
+BUILDERS = {
+    "order_confirmation": _order_confirmation,
+    "payment_confirmation": _payment_confirmation,
+}
+
+
+def enqueue(kind, **payload):
+    """Queue an email; call inside the transaction that makes it true"""
+    return enqueue_many([(kind, payload)])[0]
+
+
+def enqueue_many(messages):
+    """Queue several (kind, payload) emails with one INSERT"""
+    for kind, _ in messages:
+        if kind not in BUILDERS:
+            raise ValueError(f"Unknown outbox message kind: {kind}")
+    return OutboxMessage.objects.bulk_create(
+        [OutboxMessage(kind=kind, payload=payload) for kind, payload in messages]
+    )
+
+
+class BrevoTransport:
+    def send(self, message):
+        try:
+            email.send_email(message)
+        except ApiException as e:
+            # Client errors other than rate limiting won't succeed on retry
+            if e.status and 400 <= e.status < 500 and e.status != 429:
+                raise PermanentError(f"Brevo rejected the message: {e.status} {e.reason}") from e
+            raise
+
+
+class StubTransport:
+    """Keeps messages in memory instead of sending them, for tests and local runs"""
+    sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+
+def get_transport():
+    return import_string(
+        getattr(settings, "EMAIL_OUTBOX_TRANSPORT", "payments.outbox.BrevoTransport")
+    )()
+
+
+def backoff(attempts):
+    """Exponential delay before retry number `attempts`, with jitter so retries spread out"""
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+def claim(batch_size):
+    """Lease up to `batch_size` due messages to this worker"""
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(status="pending", next_attempt_at__lte=now)
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        if messages:
+            OutboxMessage.objects.filter(id__in=[m.id for m in messages]).update(
+                attempts=F("attempts") + 1,
+                next_attempt_at=now + LEASE,
+            )
+    for message in messages:
+        message.attempts += 1
+    return messages
+
+
+def _deliver(transport, message, built):
+    try:
+        transport.send(built)
+        return message, None
+    except Exception as e:
+        return message, e
+
+
+def process_batch(transport, executor, batch_size):
+    """
+    Claim a batch, send it through `executor`'s threads and record the
+    outcome with two bulk writes. Returns (sent, retried, dead).
+    """
+    messages = claim(batch_size)
+    if not messages:
+        return 0, 0, 0
+
+    # Build in this thread (it needs the database), send in the pool
+    futures = []
+    failures = []
+    for message in messages:
+        try:
+            built = BUILDERS[message.kind](message.payload)
+        except Exception as e:
+            failures.append((message, PermanentError(f"Could not build message: {e!r}")))
+            continue
+        futures.append(executor.submit(_deliver, transport, message, built))
+
+    sent_ids = []
+    for future in futures:
+        message, error = future.result()
+        if error is None:
+            sent_ids.append(message.id)
+        else:
+            failures.append((message, error))
+
+    now = timezone.now()
+    if sent_ids:
+        OutboxMessage.objects.filter(id__in=sent_ids).update(
+            status="sent", sent_at=now, last_error=""
+        )
+
+    dead = 0
+    for message, error in failures:
+        message.last_error = f"{type(error).__name__}: {error}"[:2000]
+        if isinstance(error, PermanentError) or message.attempts >= MAX_ATTEMPTS:
+            message.status = "dead"
+            dead += 1
+            logger.error(f"Outbox message {message.id} dead-lettered: {message.last_error}")
+        else:
+            message.next_attempt_at = now + backoff(message.attempts)
+            logger.warning(f"Outbox message {message.id} failed (attempt {message.attempts}): {message.last_error}")
+
+    if failures:
+        OutboxMessage.objects.bulk_update(
+            [message for message, _ in failures],
+            ["status", "next_attempt_at", "last_error"],
+        )
+
+    return len(sent_ids), len(failures) - dead, dead
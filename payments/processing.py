@@ -0,0 +1,128 @@
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from orders.models import Order
+from orders.stats import invalidate_order_stats
+from . import outbox
+from .models import Payment
+
+logger = logging.getLogger(__name__)
+
+
+@transaction.atomic
+def mark_order_paid(order_id, razorpay_order_id, razorpay_payment_id, razorpay_signature=None):
+    """
+    Mark an order and its payment paid and queue the confirmation emails,
+    all in one transaction. Returns False when the order was already paid,
+    so repeated callbacks don't send the emails twice.
+    """
+    order = Order.objects.select_for_update().get(id=order_id)
+    if order.is_paid:
+        return False
+
+    now = timezone.now()
+    order.is_paid = True
+    order.status = "paid"
+    order.payment_id = razorpay_payment_id
+    order.paid_at = now
+    order.save(update_fields=["is_paid", "status", "payment_id", "paid_at"])
+
+    payment, created = Payment.objects.update_or_create(
+        order=order,
+        defaults={
+            "razorpay_order_id": razorpay_order_id,
+            "razorpay_payment_id": razorpay_payment_id,
+            "razorpay_signature": razorpay_signature,
+            "status": "paid",
+            "paid_at": now,
+        },
+    )
+    if created:
+        logger.warning(f"Payment record not found for order {order.id}, created new one")
+
+    # The outbox worker sends these once this transaction commits, and
+    # pre-renders the invoice while building the order confirmation
+    outbox.enqueue("payment_confirmation", payment_id=payment.id)
+    outbox.enqueue("order_confirmation", order_id=order.id)
+
+    logger.info(f"Order {order.id} marked as paid, confirmation emails queued")
+    return True
+
+
+@transaction.atomic
+def mark_orders_paid(captures):
+    """
+    Bulk version of mark_order_paid for payments confirmed by the gateway
+    itself (webhooks, reconciliation), where there's no checkout signature.
+
+    `captures` maps razorpay_order_id to (razorpay_payment_id, amount in
+    paise or None). Orders are locked and updated with a handful of bulk
+    statements. Returns (orders paid now, {razorpay_order_id: error}) for
+    captures that don't match an order; orders that were already paid are
+    left alone.
+    """
+    now = timezone.now()
+    orders = list(Order.objects.select_for_update().filter(razorpay_order_id__in=captures))
+    payments = {
+        payment.order_id: payment
+        for payment in Payment.objects.filter(order__in=orders)
+    }
+
+    errors = {}
+    paid = []
+    new_payments = []
+    found = {order.razorpay_order_id for order in orders}
+    for razorpay_order_id in captures:
+        if razorpay_order_id not in found:
+            errors[razorpay_order_id] = f"No order with razorpay_order_id {razorpay_order_id}"
+
+    for order in orders:
+        payment_id, amount = captures[order.razorpay_order_id]
+        if amount is not None and amount != int(order.total_price * 100):
+            errors[order.razorpay_order_id] = f"Amount {amount} does not match order total {order.total_price}"
+            continue
+        if order.is_paid:
+            continue
+
+        order.is_paid = True
+        order.status = "paid"
+        order.payment_id = payment_id
+        order.paid_at = now
+        paid.append(order)
+
+        payment = payments.get(order.id)
+        if payment is None:
+            new_payments.append(Payment(
+                order=order,
+                razorpay_order_id=order.razorpay_order_id,
+                razorpay_payment_id=payment_id,
+                amount=amount,
+                status="paid",
+                paid_at=now,
+            ))
+        else:
+            payment.razorpay_order_id = order.razorpay_order_id
+            payment.razorpay_payment_id = payment_id
+            payment.status = "paid"
+            payment.paid_at = now
+
+    if paid:
+        Order.objects.bulk_update(paid, ["is_paid", "status", "payment_id", "paid_at"])
+        invalidate_order_stats(order.user_id for order in paid)
+
+        updated_payments = [payments[order.id] for order in paid if order.id in payments]
+        Payment.objects.bulk_update(
+            updated_payments,
+            ["razorpay_order_id", "razorpay_payment_id", "status", "paid_at"],
+        )
+        Payment.objects.bulk_create(new_payments)
+
+        outbox.enqueue_many(
+            [("payment_confirmation", {"payment_id": payment.id}) for payment in updated_payments + new_payments]
+            + [("order_confirmation", {"order_id": order.id}) for order in paid]
+        )
+        logger.info(f"{len(paid)} orders marked as paid, confirmation emails queued")
+
+    return paid, errors
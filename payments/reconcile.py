@@ -0,0 +1,107 @@
+import logging
+from collections import Counter
+from datetime import timedelta
+from itertools import islice
+
+from django.utils import timezone
+
+from orders.models import Order
+from . import processing
+from .clients import CircuitOpen, get_razorpay_client
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 200
+# Orders younger than this may still be mid-checkout
+GRACE_PERIOD = timedelta(minutes=15)
+
+
+def pending_orders(older_than=GRACE_PERIOD):
+    """razorpay_order_ids of unpaid orders that reached the gateway"""
+    return (
+        Order.objects.filter(
+            is_paid=False,
+            status="pending",
+            razorpay_order_id__isnull=False,
+            created_at__lt=timezone.now() - older_than,
+        )
+        .exclude(razorpay_order_id="")
+        .order_by("id")
+        .values_list("razorpay_order_id", flat=True)
+    )
+
+
+def gateway_status(client, razorpay_order_id):
+    """
+    Ask the gateway what happened to an order. Returns ("captured",
+    (payment_id, amount)), ("failed", None) when every attempt failed, or
+    ("unpaid", None).
+    """
+    payments = client.order.payments(razorpay_order_id).get("items", [])
+    for payment in payments:
+        if payment.get("status") == "captured":
+            return "captured", (payment["id"], payment.get("amount"))
+    if payments and all(payment.get("status") == "failed" for payment in payments):
+        return "failed", None
+    return "unpaid", None
+
+
+def _lookup(client, razorpay_order_id):
+    try:
+        return gateway_status(client, razorpay_order_id)
+    except Exception as e:
+        return "error", e
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def reconcile(executor, batch_size=BATCH_SIZE, older_than=GRACE_PERIOD, dry_run=False):
+    """
+    Check pending orders against the gateway `batch_size` at a time,
+    looking each batch up concurrently on `executor` and marking the
+    captured ones paid in one transaction per batch. Only one batch is in
+    memory at a time.
+
+    Yields a Counter of outcomes per batch. Raises CircuitOpen, after
+    applying what it has, once the gateway stops answering.
+    """
+    client = get_razorpay_client()
+    rows = pending_orders(older_than).iterator(chunk_size=batch_size)
+
+    for batch in _batches(rows, batch_size):
+        counts = Counter(checked=len(batch))
+        captures = {}
+        circuit_open = None
+
+        for razorpay_order_id, (status, detail) in zip(
+            batch, executor.map(lambda rid: _lookup(client, rid), batch)
+        ):
+            if status == "captured":
+                captures[razorpay_order_id] = detail
+            elif status == "error":
+                counts["errors"] += 1
+                if isinstance(detail, CircuitOpen):
+                    circuit_open = detail
+                else:
+                    logger.warning(f"Could not reconcile {razorpay_order_id}: {detail!r}")
+            else:
+                counts[status] += 1
+
+        if captures:
+            if dry_run:
+                counts["paid"] += len(captures)
+            else:
+                paid, errors = processing.mark_orders_paid(captures)
+                counts["paid"] += len(paid)
+                counts["mismatched"] += len(errors)
+                for razorpay_order_id, error in errors.items():
+                    logger.error(f"Not reconciling {razorpay_order_id}: {error}")
+
+        yield counts
+
+        if circuit_open:
+            raise circuit_open
@@ -1,3 +1,253 @@
-from django.test import TestCase
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from orders.models import Order
+from . import outbox, reconcile
+from .clients import CircuitOpen, get_razorpay_client
+from .fake_gateway import FakeRazorpay
+from .models import OutboxMessage, Payment
+from .processing import mark_order_paid, mark_orders_paid
+
+
+class FailingTransport:
+    def __init__(self, error):
+        self.error = error
+
+    def send(self, message):
+        raise self.error
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        # A kind whose message is just its payload, so no email is built
+        patcher = mock.patch.dict(outbox.BUILDERS, {"test": lambda payload: payload})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(self.executor.shutdown)
+
+    def process(self, transport):
+        return outbox.process_batch(transport, self.executor, batch_size=10)
+
+    def test_claim_leases_message_until_lease_expires(self):
+        message = outbox.enqueue("test", n=1)
+
+        claimed = outbox.claim(10)
+        self.assertEqual([m.id for m in claimed], [message.id])
+        self.assertEqual(claimed[0].attempts, 1)
+
+        # Leased to the first worker, so nobody else gets it
+        self.assertEqual(outbox.claim(10), [])
+
+        later = timezone.now() + outbox.LEASE + timedelta(seconds=1)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            reclaimed = outbox.claim(10)
+        self.assertEqual([m.id for m in reclaimed], [message.id])
+        self.assertEqual(reclaimed[0].attempts, 2)
+
+    def test_sent_message_is_not_claimed_again(self):
+        outbox.enqueue("test", n=1)
+        transport = outbox.StubTransport()
+        transport.sent = []
+
+        self.assertEqual(self.process(transport), (1, 0, 0))
+        self.assertEqual(transport.sent, [{"n": 1}])
+        self.assertEqual(OutboxMessage.objects.get().status, "sent")
+        self.assertEqual(self.process(transport), (0, 0, 0))
+
+    def test_failed_message_is_retried_with_backoff(self):
+        message = outbox.enqueue("test", n=1)
+        before = timezone.now()
+
+        self.assertEqual(self.process(FailingTransport(ConnectionError("down"))), (0, 1, 0))
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, "pending")
+        self.assertEqual(message.attempts, 1)
+        self.assertIn("ConnectionError: down", message.last_error)
+        # First retry waits between half and all of BACKOFF_BASE
+        self.assertGreaterEqual(message.next_attempt_at, before + timedelta(seconds=outbox.BACKOFF_BASE / 2))
+        self.assertLessEqual(message.next_attempt_at, timezone.now() + timedelta(seconds=outbox.BACKOFF_BASE))
+        self.assertEqual(outbox.claim(10), [])
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        with mock.patch("payments.outbox.random.uniform", return_value=1):
+            delays = [outbox.backoff(attempts).total_seconds() for attempts in range(1, 12)]
+
+        self.assertEqual(delays[:3], [outbox.BACKOFF_BASE, outbox.BACKOFF_BASE * 2, outbox.BACKOFF_BASE * 4])
+        self.assertEqual(max(delays), outbox.BACKOFF_MAX)
+
+    def test_message_is_dead_lettered_after_max_attempts(self):
+        message = outbox.enqueue("test", n=1)
+        OutboxMessage.objects.filter(id=message.id).update(attempts=outbox.MAX_ATTEMPTS - 1)
+
+        self.assertEqual(self.process(FailingTransport(ConnectionError("down"))), (0, 0, 1))
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, "dead")
+        self.assertEqual(message.attempts, outbox.MAX_ATTEMPTS)
+
+    def test_permanent_error_is_dead_lettered_at_once(self):
+        message = outbox.enqueue("test", n=1)
+
+        self.assertEqual(self.process(FailingTransport(outbox.PermanentError("rejected"))), (0, 0, 1))
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, "dead")
+        self.assertEqual(message.attempts, 1)
+
+
+class MarkOrderPaidTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("buyer", "buyer@example.com", "password")
+        self.order = Order.objects.create(
+            user=user, total_price=Decimal("499.00"), razorpay_order_id="order_race1"
+        )
+        Payment.objects.create(order=self.order, razorpay_order_id="order_race1", amount=49900)
+
+    def assert_paid_once(self):
+        self.order.refresh_from_db()
+        self.assertTrue(self.order.is_paid)
+        self.assertEqual(self.order.payment_id, "pay_race1")
+        self.assertEqual(Payment.objects.get(order=self.order).status, "paid")
+        self.assertEqual(
+            sorted(OutboxMessage.objects.values_list("kind", flat=True)),
+            ["order_confirmation", "payment_confirmation"],
+        )
+
+    def test_webhook_after_verify_payment_queues_nothing(self):
+        self.assertTrue(mark_order_paid(self.order.id, "order_race1", "pay_race1", "signature"))
+
+        paid, errors = mark_orders_paid({"order_race1": ("pay_race1", 49900)})
+
+        self.assertEqual((paid, errors), ([], {}))
+        self.assert_paid_once()
+
+    def test_verify_payment_after_webhook_queues_nothing(self):
+        paid, errors = mark_orders_paid({"order_race1": ("pay_race1", 49900)})
+        self.assertEqual([order.id for order in paid], [self.order.id])
+
+        self.assertFalse(mark_order_paid(self.order.id, "order_race1", "pay_race1", "signature"))
+        self.assert_paid_once()
+
+    def test_repeated_callback_queues_nothing(self):
+        self.assertTrue(mark_order_paid(self.order.id, "order_race1", "pay_race1", "signature"))
+        self.assertFalse(mark_order_paid(self.order.id, "order_race1", "pay_race1", "signature"))
+        self.assert_paid_once()
+
+
+@override_settings(
+    RAZORPAY_KEY_ID="rzp_test_key",
+    RAZORPAY_KEY_SECRET="secret",
+    RAZORPAY_TIMEOUT=(1, 0.2),
+    GATEWAY_RETRIES=0,
+    GATEWAY_BREAKER_THRESHOLD=3,
+    GATEWAY_BREAKER_RESET=60,
+)
+class ReconcileTests(TestCase):
+    def setUp(self):
+        self.gateway = self.enterContext(FakeRazorpay())
+        self.enterContext(override_settings(RAZORPAY_BASE_URL=self.gateway.url))
+        # Build the client (and its breaker) from these settings
+        get_razorpay_client.cache_clear()
+        self.addCleanup(get_razorpay_client.cache_clear)
+
+        self.user = User.objects.create_user("buyer", "buyer@example.com", "password")
+
+    def order(self, razorpay_order_id, total="499.00", captured=True, gateway_amount=None):
+        order = Order.objects.create(
+            user=self.user, total_price=Decimal(total), razorpay_order_id=razorpay_order_id
+        )
+        amount = gateway_amount if gateway_amount is not None else int(order.total_price * 100)
+        self.gateway.add_order(razorpay_order_id, amount=amount, captured=captured)
+        return order
+
+    def reconcile(self, **kwargs):
+        totals = Counter()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            for counts in reconcile.reconcile(executor, older_than=timedelta(0), **kwargs):
+                totals.update(counts)
+        return totals
+
+    def reconcile_command(self, *args):
+        out = StringIO()
+        call_command("reconcile_payments", "--older-than", "0", "--workers", "1", *args, stdout=out)
+        return out.getvalue()
+
+    def test_captured_order_is_marked_paid(self):
+        order = self.order("order_captured1")
+
+        totals = self.reconcile()
+
+        self.assertEqual((totals["checked"], totals["paid"]), (1, 1))
+        order.refresh_from_db()
+        self.assertTrue(order.is_paid)
+        self.assertEqual(order.payment_id, self.gateway.payments["order_captured1"][0]["id"])
+        self.assertEqual(
+            OutboxMessage.objects.filter(kind="order_confirmation", payload__order_id=order.id).count(), 1
+        )
+
+        # Paid orders aren't checked again
+        self.assertEqual(self.reconcile()["checked"], 0)
+
+    def test_failed_and_unattempted_orders_stay_pending(self):
+        failed = self.order("order_failed1", captured=False)
+        unpaid = self.order("order_unpaid1", captured=None)
+
+        totals = self.reconcile()
+
+        self.assertEqual((totals["failed"], totals["unpaid"], totals["paid"]), (1, 1, 0))
+        for order in (failed, unpaid):
+            order.refresh_from_db()
+            self.assertFalse(order.is_paid)
+
+    def test_amount_mismatch_is_not_marked_paid(self):
+        order = self.order("order_short1", total="499.00", gateway_amount=100)
+
+        totals = self.reconcile()
+
+        self.assertEqual((totals["paid"], totals["mismatched"]), (0, 1))
+        order.refresh_from_db()
+        self.assertFalse(order.is_paid)
+
+    def test_dry_run_writes_nothing(self):
+        order = self.order("order_dry1")
+
+        output = self.reconcile_command("--dry-run")
+
+        self.assertIn("1 would be marked paid", output)
+        order.refresh_from_db()
+        self.assertFalse(order.is_paid)
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.assertFalse(Payment.objects.exists())
+
+    def test_breaker_opens_when_gateway_errors(self):
+        orders = [self.order(f"order_down{i}") for i in range(6)]
+        self.gateway.error_rate = 1.0
+
+        with self.assertRaisesMessage(CommandError, "razorpay is unavailable"):
+            self.reconcile_command()
+
+        self.assertIsNotNone(get_razorpay_client().session.service.breaker.opened_at)
+        self.assertFalse(Order.objects.filter(id__in=[o.id for o in orders], is_paid=True).exists())
+
+    def test_breaker_opens_when_gateway_is_slow(self):
+        for i in range(6):
+            self.order(f"order_slow{i}")
+        self.gateway.latency = 0.5  # over the 0.2s read timeout
+
+        with self.assertRaises(CircuitOpen):
+            self.reconcile()
+
+        self.assertIsNotNone(get_razorpay_client().session.service.breaker.opened_at)
+        self.assertFalse(Order.objects.filter(is_paid=True).exists())
@@ -5,4 +5,5 @@ urlpatterns = [
     path("pay/<int:order_id>/", views.start_payment, name="start_payment"),
     path("verify/", views.verify_payment, name="verify_payment"),
     path("success/", views.payment_success, name="payment_success"),
+    path("webhook/", views.webhook, name="payment_webhook"),
 ]
\ No newline at end of file
@@ -1,59 +1,93 @@
+import hashlib
+import json
+
 import razorpay
 from django.conf import settings
+from django.db import transaction
 from django.shortcuts import render, get_object_or_404, redirect
 
 from orders.models import Order
 from .models import Payment
-from .email import send_payment_confirmation_email, send_order_confirmation_email
+from . import webhooks
+from .clients import get_razorpay_client
+from .processing import mark_order_paid
 
 from django.views.decorators.csrf import csrf_exempt
-from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_POST
+from django.http import JsonResponse
 import logging
 from django.contrib.auth.decorators import login_required
-from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
-client = razorpay.Client(
-    auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
-)
+def _reusable_payment(order, amount):
+    """The order's pending payment, if its gateway order is for this amount"""
+    payment = Payment.objects.filter(order=order).first()
+    if (
+        payment
+        and payment.status == "created"
+        and payment.amount == amount
+        and payment.razorpay_order_id == order.razorpay_order_id
+    ):
+        return payment
+    return None
 
 
 def start_payment(request, order_id):
     """Initiate Razorpay payment"""
     order = get_object_or_404(Order, id=order_id, user=request.user)
 
-    amount = int(order.total_price * 100)  # paise
-
-    try:
-        razorpay_order = client.order.create({
-            "amount": amount,
-            "currency": "INR",
-            "payment_capture": "1"
-        })
-        
-    except Exception as e:
-        logger.error(f"Error creating Razorpay order: {str(e)}")
-        return render(request, "payments/error.html", {
-            "message": "Failed to initiate payment. Please try again."
-        })
+    if order.is_paid:
+        return redirect("order_detail", order_id=order.id)
 
-    # Store razorpay_order_id in Order model
-    order.razorpay_order_id = razorpay_order["id"]
-    order.save()
+    amount = int(order.total_price * 100)  # paise
 
-    # Create Payment record
-    payment = Payment.objects.create(
-        order=order,
-        razorpay_order_id=razorpay_order["id"]
-    )
+    # Refreshing the payment page reuses the gateway order already created
+    # for this order instead of making another round trip
+    payment = _reusable_payment(order, amount)
+
+    if payment is None:
+        with transaction.atomic():
+            # Lock the order so concurrent loads of the page don't each
+            # create a gateway order; the second one reuses the first's
+            order = Order.objects.select_for_update().get(id=order.id)
+            payment = _reusable_payment(order, amount)
+
+            if payment is None:
+                try:
+                    razorpay_order = get_razorpay_client().order.create({
+                        "amount": amount,
+                        "currency": "INR",
+                        "receipt": f"order_{order.id}",
+                        "payment_capture": "1"
+                    })
+
+                except Exception as e:
+                    logger.error(f"Error creating Razorpay order: {str(e)}")
+                    return render(request, "payments/error.html", {
+                        "message": "Failed to initiate payment. Please try again."
+                    })
+
+                # Store razorpay_order_id in Order model
+                order.razorpay_order_id = razorpay_order["id"]
+                order.save(update_fields=["razorpay_order_id"])
+
+                # One Payment per order: point it at the new gateway order
+                payment, _ = Payment.objects.update_or_create(
+                    order=order,
+                    defaults={
+                        "razorpay_order_id": razorpay_order["id"],
+                        "amount": amount,
+                        "status": "created",
+                    },
+                )
 
     return render(request, "payments/pay.html", {
         "order": order,
         "payment": payment,
         "razorpay_key": settings.RAZORPAY_KEY_ID,
         "amount": amount,
-        "razorpay_order_id": razorpay_order["id"],
+        "razorpay_order_id": payment.razorpay_order_id,
     })
 
 
@@ -87,7 +121,6 @@ def verify_payment(request):
                 "razorpay_signature": request.POST.get("razorpay_signature"),
             }
         else:
-            import json
             body = json.loads(request.body.decode("utf-8"))
             data = {
                 "razorpay_order_id": body.get("razorpay_order_id"),
@@ -97,7 +130,7 @@ def verify_payment(request):
 
         # Verify Razorpay signature
         try:
-            client.utility.verify_payment_signature(data)
+            get_razorpay_client().utility.verify_payment_signature(data)
             logger.info(f"Payment signature verified for order: {data['razorpay_order_id']}")
         except razorpay.BadRequestError as e:
             logger.error(f"Payment signature verification failed: {str(e)}")
@@ -110,49 +143,43 @@ def verify_payment(request):
             logger.error(f"Order not found for razorpay_order_id: {data['razorpay_order_id']}")
             return JsonResponse({"error": "Order not found"}, status=404)
 
-        # Update Order model
-        order.is_paid = True
-        order.status = "paid"
-        order.payment_id = data["razorpay_payment_id"]
-        order.paid_at = timezone.now()
-        order.save()
-        logger.info(f"Order {order.id} marked as paid")
-
-        # Update Payment record
-        try:
-            payment = Payment.objects.get(razorpay_order_id=data["razorpay_order_id"])
-            payment.razorpay_payment_id = data["razorpay_payment_id"]
-            payment.razorpay_signature = data["razorpay_signature"]
-            payment.status = "paid"
-            payment.paid_at = timezone.now()
-            payment.save()
-            logger.info(f"Payment record updated for order {order.id}")
-        except Payment.DoesNotExist:
-            logger.warning(f"Payment record not found for order {order.id}, creating new one")
-            payment = Payment.objects.create(
-                order=order,
-                razorpay_order_id=data["razorpay_order_id"],
-                razorpay_payment_id=data["razorpay_payment_id"],
-                razorpay_signature=data["razorpay_signature"],
-                status="paid",
-                paid_at=timezone.now()
-            )
-
-        # Send confirmation emails (wrapped in try-except to prevent payment from failing)
-        try:
-            send_payment_confirmation_email(payment)
-        except Exception as e:
-            logger.error(f"Failed to send payment confirmation email: {e}")
-        
-        try:
-            send_order_confirmation_email(order)
-        except Exception as e:
-            logger.error(f"Failed to send order confirmation email: {e}")
-        
-        logger.info(f"Confirmation emails sent for order {order.id}")
+        # The confirmation emails are queued, not sent, so this response
+        # doesn't wait on the email API
+        mark_order_paid(
+            order.id,
+            data["razorpay_order_id"],
+            data["razorpay_payment_id"],
+            data["razorpay_signature"],
+        )
 
         return redirect("payment_success")
 
     except Exception as e:
         logger.error(f"Unexpected error during payment verification: {str(e)}")
-        return JsonResponse({"error": "An unexpected error occurred"}, status=500)
\ No newline at end of file
+        return JsonResponse({"error": "An unexpected error occurred"}, status=500)
+
+
+@csrf_exempt
+@require_POST
+def webhook(request):
+    """
+    Razorpay webhook receiver: verify the signature, store the event and
+    acknowledge at once. `manage.py process_webhooks` applies it later.
+    """
+    if not webhooks.verify_signature(request.body, request.headers.get("X-Razorpay-Signature")):
+        logger.warning("Rejected webhook with an invalid signature")
+        return JsonResponse({"error": "Invalid signature"}, status=400)
+
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+
+    # Retries of an event carry the same id; fall back to the body hash
+    event_id = request.headers.get("X-Razorpay-Event-Id") or hashlib.sha256(request.body).hexdigest()
+    webhooks.record_event(event_id[:100], payload)
+
+    return JsonResponse({"status": "ok"})
+
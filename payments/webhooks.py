@@ -0,0 +1,104 @@
+import hashlib
+import hmac
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import processing
+from .models import WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_EVENTS = ("payment.captured", "order.paid")
+
+
+def verify_signature(body, signature):
+    """Check the X-Razorpay-Signature header: HMAC-SHA256 of the raw body"""
+    secret = settings.RAZORPAY_WEBHOOK_SECRET
+    if not secret or not signature:
+        return False
+
+    expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def record_event(event_id, payload):
+    """
+    Store a delivery with a single INSERT ... ON CONFLICT DO NOTHING, so a
+    retried event costs one statement and is never applied twice.
+    """
+    WebhookEvent.objects.bulk_create(
+        [WebhookEvent(
+            event_id=event_id,
+            event_type=str(payload.get("event", ""))[:100],
+            payload=payload,
+        )],
+        ignore_conflicts=True,
+    )
+
+
+def _payment_details(event):
+    """(razorpay_order_id, razorpay_payment_id, amount in paise) of a payment event"""
+    payment = event.payload.get("payload", {}).get("payment", {}).get("entity", {})
+    return payment.get("order_id"), payment.get("id"), payment.get("amount")
+
+
+@transaction.atomic
+def _apply(events):
+    """
+    Apply one batch of events, marking each processed, ignored or failed.
+    Several events for one order (payment.captured and order.paid) only
+    pay it once.
+    """
+    captures = {}
+    for event in events:
+        event.status = "processed"
+        event.error = ""
+        razorpay_order_id, payment_id, amount = _payment_details(event)
+        if event.event_type not in PAYMENT_EVENTS or not razorpay_order_id or not payment_id:
+            event.status = "ignored"
+            continue
+        captures.setdefault(razorpay_order_id, (payment_id, amount))
+
+    _, errors = processing.mark_orders_paid(captures) if captures else ([], {})
+
+    now = timezone.now()
+    for event in events:
+        error = errors.get(_payment_details(event)[0]) if event.status == "processed" else None
+        if error:
+            event.status = "failed"
+            event.error = error
+        event.processed_at = now
+    WebhookEvent.objects.bulk_update(events, ["status", "error", "processed_at"])
+
+
+def process_batch(batch_size):
+    """Apply up to `batch_size` pending events. Returns how many were handled"""
+    with transaction.atomic():
+        events = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(status="pending")
+            .order_by("received_at")[:batch_size]
+        )
+        if not events:
+            return 0
+
+        # _apply runs in a savepoint, so a failed batch leaves no writes
+        try:
+            _apply(events)
+        except Exception:
+            # Find the event that breaks the batch and let the others through
+            logger.exception("Webhook batch failed, applying events one at a time")
+            for event in events:
+                try:
+                    _apply([event])
+                except Exception as e:
+                    WebhookEvent.objects.filter(id=event.id).update(
+                        status="failed",
+                        error=f"{type(e).__name__}: {e}"[:2000],
+                        processed_at=timezone.now(),
+                    )
+
+    return len(events)
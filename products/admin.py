@@ -1,14 +1,22 @@
 from django.contrib import admin
-from .models import Category, Product
+from .models import Category, Product, RecommendationRun
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ("id", "name")
+    list_display = ("id", "name", "product_count", "in_stock_count")
+    readonly_fields = ("product_count", "in_stock_count")
 
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ("id", "name", "price", "stock", "category")
+    list_display = ("id", "sku", "name", "price", "stock", "reserved", "category")
     list_filter = ("category",)
-    search_fields = ("name",)
\ No newline at end of file
+    # Maintained by checkout reservations; Product.save() never writes it
+    readonly_fields = ("reserved",)
+    search_fields = ("name", "sku")
+
+
+@admin.register(RecommendationRun)
+class RecommendationRunAdmin(admin.ModelAdmin):
+    list_display = ("id", "created_at", "paid_until", "orders_processed")
@@ -0,0 +1,111 @@
+from django.http import Http404
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from rest_framework.decorators import (
+    api_view,
+    authentication_classes,
+    permission_classes,
+    renderer_classes,
+)
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from . import cache as catalog_cache
+from .conditional import api_etag
+from .filters import filter_products, listing_filters
+from .models import Category, Product
+from .pagination import PAGE_SIZE, keyset_page
+from .serializers import CategorySerializer, ProductSerializer
+
+MAX_PAGE_SIZE = 100
+
+
+def catalog_api(view):
+    """
+    Read-only, anonymous JSON endpoint: no session/CSRF work, JSON only, and
+    conditional GETs answered from the catalog version before the view runs.
+    """
+    view = renderer_classes([JSONRenderer])(view)
+    view = permission_classes([AllowAny])(view)
+    view = authentication_classes([])(view)
+    view = api_view(["GET"])(view)
+    view = condition(etag_func=api_etag)(view)
+    return cache_control(public=True, no_cache=True)(view)
+
+
+def _page_size(request):
+    value = request.GET.get("page_size", "")
+    if value.isdigit():
+        return min(max(int(value), 1), MAX_PAGE_SIZE)
+    return PAGE_SIZE
+
+
+def _load_products(serializer, filters, cursor, page_size):
+    products = filter_products(Product.objects.filter(stock__gt=0), *filters)
+    rows, next_cursor = keyset_page(serializer.select(products), cursor, page_size)
+
+    return {
+        "next_cursor": next_cursor,
+        "results": serializer.serialize(rows),
+    }
+
+
+@catalog_api
+def product_list(request):
+    """
+    GET /api/products/?fields=id,name,price&category=<id>&min_price=<n>
+    &max_price=<n>&page_size=<n>&cursor=<token>
+    """
+    serializer = ProductSerializer(request.GET.get("fields"))
+    filters = listing_filters(request.GET)
+    cursor = request.GET.get("cursor")
+    page_size = _page_size(request)
+
+    payload = catalog_cache.get_or_build(
+        "api-products",
+        (tuple(serializer.names), filters, cursor, page_size),
+        lambda: _load_products(serializer, filters, cursor, page_size),
+    )
+
+    next_url = None
+    if payload["next_cursor"]:
+        params = request.GET.copy()
+        params["cursor"] = payload["next_cursor"]
+        next_url = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+
+    return Response({
+        "next": next_url,
+        "results": payload["results"],
+    })
+
+
+def _load_product(serializer, product_id):
+    row = serializer.select(Product.objects.filter(id=product_id)).first()
+    if row is None:
+        raise Http404("No Product matches the given query.")
+    return serializer.to_representation(row)
+
+
+@catalog_api
+def product_detail(request, product_id):
+    serializer = ProductSerializer(request.GET.get("fields"))
+
+    data = catalog_cache.get_or_build(
+        "api-product",
+        (tuple(serializer.names), product_id),
+        lambda: _load_product(serializer, product_id),
+    )
+    return Response(data)
+
+
+@catalog_api
+def category_list(request):
+    serializer = CategorySerializer(request.GET.get("fields"))
+
+    results = catalog_cache.get_or_build(
+        "api-categories",
+        (tuple(serializer.names),),
+        lambda: serializer.serialize(serializer.select(Category.objects.order_by("name"))),
+    )
+    return Response({"results": results})
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ProductsConfig(AppConfig):
     name = 'products'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "catalog:version"
+MODIFIED_KEY = "catalog:modified"
+HITS_KEY = "catalog:stats:hits"
+MISSES_KEY = "catalog:stats:misses"
+# Lookups are tallied in process memory and added to the shared counters
+# once this many have built up, so a cached page doesn't write to the
+# cache on every request
+STATS_FLUSH_EVERY = 100
+
+_pending = Counter()
+_pending_lock = threading.Lock()
+
+# Backends whose entries only the current process can see
+PROCESS_LOCAL_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def get_cache():
+    return caches[getattr(settings, "CATALOG_CACHE_ALIAS", "default")]
+
+
+def is_shared(alias=None):
+    """
+    Whether every process sees the same entries in the `alias` cache (the
+    catalog cache by default). A process-local cache never hears about
+    bumps or deletes made by other workers or by management commands.
+    """
+    alias = alias or getattr(settings, "CATALOG_CACHE_ALIAS", "default")
+    return settings.CACHES[alias]["BACKEND"] not in PROCESS_LOCAL_BACKENDS
+
+
+def get_catalog_version():
+    """Return the current catalog version, initialising it if it was evicted"""
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+
+    if version is None:
+        # Seed from the clock so a version key lost to eviction never
+        # comes back at a value whose entries are still lying around
+        if cache.add(VERSION_KEY, time.time_ns() // 1_000_000, timeout=None):
+            cache.set(MODIFIED_KEY, timezone.now(), timeout=None)
+        version = cache.get(VERSION_KEY)
+
+    return version
+
+
+def _bump():
+    cache = get_cache()
+    try:
+        version = cache.incr(VERSION_KEY)
+    except ValueError:
+        version = get_catalog_version()
+    else:
+        # The database and file backends implement incr as get + set with
+        # the default timeout; without this the version would expire and be
+        # re-seeded, dropping every cached page, a few minutes after a bump
+        cache.touch(VERSION_KEY, timeout=None)
+
+    cache.set(MODIFIED_KEY, timezone.now(), timeout=None)
+    logger.debug(f"Catalog cache version bumped to {version}")
+
+
+def get_catalog_modified():
+    """Return when the catalog last changed, or None if it isn't known"""
+    get_catalog_version()
+    return get_cache().get(MODIFIED_KEY)
+
+
+def bump_catalog_version():
+    """
+    Invalidate every cached catalog entry by moving to a new version.
+
+    Deferred until the surrounding transaction commits so a concurrent
+    reader can't repopulate the new version from uncommitted data.
+    """
+    transaction.on_commit(_bump)
+
+
+def _count(key):
+    with _pending_lock:
+        _pending[key] += 1
+        if _pending.total() < STATS_FLUSH_EVERY:
+            return
+        counts = dict(_pending)
+        _pending.clear()
+    _flush(counts)
+
+
+def _flush(counts):
+    cache = get_cache()
+    for key, count in counts.items():
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            cache.add(key, 0, timeout=None)
+            cache.incr(key, count)
+        # incr resets the timeout on some backends (see _bump)
+        cache.touch(key, timeout=None)
+
+
+def _make_key(namespace, params):
+    digest = hashlib.md5(repr(params).encode("utf-8")).hexdigest()
+    return f"catalog:{namespace}:{digest}"
+
+
+def get_or_build(namespace, params, builder):
+    """
+    Read-through lookup: return the cached value for `namespace`/`params`
+    under the current catalog version, calling `builder()` on a miss.
+    """
+    cache = get_cache()
+    key = _make_key(namespace, params)
+    version = get_catalog_version()
+
+    value = cache.get(key, version=version)
+    if value is not None:
+        _count(HITS_KEY)
+        return value
+
+    _count(MISSES_KEY)
+    value = builder()
+    cache.set(
+        key,
+        value,
+        timeout=getattr(settings, "CATALOG_CACHE_TIMEOUT", 300),
+        version=version,
+    )
+    return value
+
+
+def get_stats():
+    """Counters shared by all processes, plus this process's unflushed lookups"""
+    cache = get_cache()
+    with _pending_lock:
+        pending = dict(_pending)
+    hits = cache.get(HITS_KEY, 0) + pending.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0) + pending.get(MISSES_KEY, 0)
+    lookups = hits + misses
+
+    return {
+        "version": get_catalog_version(),
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / lookups if lookups else 0.0,
+    }
+
+
+def reset_stats():
+    with _pending_lock:
+        _pending.clear()
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
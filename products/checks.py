@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from .cache import is_shared
+
+
+# A deployment check: the test runner turns DEBUG off too, and tests are
+# fine with a local cache
+@register(Tags.caches, deploy=True)
+def check_catalog_cache(app_configs, **kwargs):
+    """In production the catalog version must live in a cache all workers share"""
+    if settings.DEBUG or is_shared():
+        return []
+
+    return [
+        Error(
+            "The catalog cache is local to each process, so catalog changes "
+            "made by other workers and management commands are never seen.",
+            hint="Set CATALOG_CACHE_BACKEND to a shared cache: database, Redis or Memcached.",
+            obj=getattr(settings, "CATALOG_CACHE_ALIAS", "default"),
+            id="products.E001",
+        )
+    ]
@@ -0,0 +1,108 @@
+import hashlib
+from functools import wraps
+
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from orders.cart import Cart
+from . import cache as catalog_cache
+from .models import Product
+
+
+def _client_state(request):
+    """
+    The parts of a catalog page that depend on the visitor rather than the
+    catalog: who is logged in, what's in the cart and the CSRF cookie that
+    the embedded forms are bound to.
+    """
+    user_id = request.user.pk if request.user.is_authenticated else ""
+    cart_state = Cart(request).fingerprint()
+    csrf_cookie = request.META.get("CSRF_COOKIE", "")
+
+    return f"{user_id}|{cart_state}|{csrf_cookie}"
+
+
+def _has_visitor_state(request):
+    # A date can't say who the page was rendered for, so Last-Modified is
+    # only offered on the pages every anonymous, empty-cart visitor shares;
+    # everyone else revalidates with the ETag, which folds in _client_state
+    return request.user.is_authenticated or len(Cart(request)) > 0
+
+
+def _etag(kind, *parts):
+    # Clients may keep a validator for good, so only issue one when the
+    # version behind it is shared by every worker; a process-local version
+    # would keep answering 304 after another process changed the catalog
+    if not catalog_cache.is_shared():
+        return None
+
+    raw = "|".join(str(part) for part in (kind, catalog_cache.get_catalog_version(), *parts))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def product_list_etag(request):
+    return _etag(
+        "list",
+        request.GET.urlencode(),
+        _client_state(request),
+    )
+
+
+def product_list_last_modified(request):
+    if not catalog_cache.is_shared() or _has_visitor_state(request):
+        return None
+    return catalog_cache.get_catalog_modified()
+
+
+def product_detail_etag(request, product_id):
+    return _etag(
+        "detail",
+        product_id,
+        _client_state(request),
+    )
+
+
+def product_detail_last_modified(request, product_id):
+    if not catalog_cache.is_shared() or _has_visitor_state(request):
+        return None
+    return catalog_cache.get_or_build(
+        "modified",
+        (product_id,),
+        lambda: Product.objects.filter(id=product_id).values_list("updated_at", flat=True).first(),
+    )
+
+
+def api_etag(request, *args, **kwargs):
+    # API responses don't depend on the visitor, only on the catalog
+    return _etag(
+        "api",
+        request.path,
+        request.GET.urlencode(),
+    )
+
+
+def catalog_condition(etag_func, last_modified_func):
+    """
+    Answer conditional GETs with 304 before the view runs, and ask browsers
+    and CDNs to revalidate on every use instead of serving a stale copy.
+    """
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=etag_func,
+            last_modified_func=last_modified_func,
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, no_cache=True)
+            # The cart may live in its own cookie rather than the session
+            patch_vary_headers(response, ("Cookie",))
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,87 @@
+from collections import defaultdict
+
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Category, Product
+
+
+def _adjust(category_id, products, in_stock):
+    """Shift one category's counts with an atomic UPDATE ... SET col = col + n"""
+    if not category_id or not (products or in_stock):
+        return
+
+    Category.objects.filter(id=category_id).update(
+        product_count=F("product_count") + products,
+        in_stock_count=F("in_stock_count") + in_stock,
+    )
+
+
+def product_saved(product, created):
+    category_id = product.category_id
+    in_stock = product.stock > 0
+
+    if created:
+        _adjust(category_id, 1, int(in_stock))
+    else:
+        loaded = getattr(product, "_loaded_facets", None)
+        # Without the stored values (e.g. an instance built by hand and
+        # saved over an existing row) the delta is unknown; recount_categories
+        # repairs that drift
+        if loaded is None or "category_id" not in loaded or "stock" not in loaded:
+            return
+
+        was_category_id = loaded["category_id"]
+        was_in_stock = loaded["stock"] > 0
+
+        if was_category_id != category_id:
+            _adjust(was_category_id, -1, -int(was_in_stock))
+            _adjust(category_id, 1, int(in_stock))
+        elif was_in_stock != in_stock:
+            _adjust(category_id, 0, 1 if in_stock else -1)
+
+    product._loaded_facets = {"category_id": category_id, "stock": product.stock}
+
+
+def product_deleted(product):
+    loaded = getattr(product, "_loaded_facets", None) or {}
+    category_id = loaded.get("category_id", product.category_id)
+    stock = loaded.get("stock", product.stock)
+
+    _adjust(category_id, -1, -int(stock > 0))
+
+
+def stock_changed(changes):
+    """
+    Apply facet deltas for stock updated in bulk, bypassing post_save.
+    `changes` yields (category_id, old_stock, new_stock) per product; only
+    products crossing zero move a category's in-stock count.
+    """
+    deltas = defaultdict(int)
+    for category_id, old_stock, new_stock in changes:
+        deltas[category_id] += (new_stock > 0) - (old_stock > 0)
+
+    for category_id, in_stock in deltas.items():
+        _adjust(category_id, 0, in_stock)
+
+
+def recount_categories(category_ids=None):
+    """Recompute the facet counts from Product in a single UPDATE"""
+    def count(condition=Q()):
+        counts = (
+            Product.objects.filter(condition, category=OuterRef("pk"))
+            .order_by()
+            .values("category")
+            .annotate(total=Count("id"))
+            .values("total")
+        )
+        return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+    categories = Category.objects.all()
+    if category_ids is not None:
+        categories = categories.filter(id__in=category_ids)
+
+    return categories.update(
+        product_count=count(),
+        in_stock_count=count(Q(stock__gt=0)),
+    )
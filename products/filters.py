@@ -0,0 +1,39 @@
+from decimal import Decimal, InvalidOperation
+
+
+def parse_price(value):
+    """Parse a price query parameter, ignoring anything that isn't a number"""
+    if not value:
+        return None
+
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        return None
+
+    return price if price.is_finite() and price >= 0 else None
+
+
+def listing_filters(params):
+    """
+    Read the optional ?category=<id>&min_price=<n>&max_price=<n> filters,
+    dropping any that are malformed.
+    """
+    category_id = params.get("category")
+    category_id = int(category_id) if category_id and category_id.isdigit() else None
+
+    return (
+        category_id,
+        parse_price(params.get("min_price")),
+        parse_price(params.get("max_price")),
+    )
+
+
+def filter_products(queryset, category_id=None, min_price=None, max_price=None):
+    if category_id is not None:
+        queryset = queryset.filter(category_id=category_id)
+    if min_price is not None:
+        queryset = queryset.filter(price__gte=min_price)
+    if max_price is not None:
+        queryset = queryset.filter(price__lte=max_price)
+    return queryset
@@ -0,0 +1,61 @@
+from django.middleware.csrf import get_token
+from django.template.loader import get_template
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .cache import get_cache
+
+CARD_TEMPLATE = "products/card.html"
+CARD_TIMEOUT = 60 * 60 * 24
+
+# Request-specific values are filled in after the cached fragments are
+# joined, so one fragment can be shared by every visitor
+CSRF_PLACEHOLDER = "__CSRF_TOKEN__"
+NEXT_PLACEHOLDER = "__NEXT_URL__"
+
+# Cards show the exact stock only when it's low; above that every stock
+# level renders the same card, so stock changes don't invalidate it
+LOW_STOCK = 10
+
+
+def stock_bucket(stock):
+    return stock if stock <= LOW_STOCK else f"{LOW_STOCK}+"
+
+
+def _card_key(product):
+    return f"card:{product.id}:{product.updated_at.timestamp()}:{stock_bucket(product.stock)}"
+
+
+def render_product_cards(request, products):
+    """
+    Render the listing's product cards, reusing cached fragments and only
+    rendering (and resolving image URLs for) the ones that changed.
+    """
+    if not products:
+        return ""
+
+    cache = get_cache()
+    keys = [_card_key(product) for product in products]
+    fragments = cache.get_many(keys)
+
+    missing = {}
+    template = None
+    for key, product in zip(keys, products):
+        if key not in fragments:
+            template = template or get_template(CARD_TEMPLATE)
+            missing[key] = template.render({
+                "product": product,
+                "stock_label": stock_bucket(product.stock),
+                "csrf_placeholder": CSRF_PLACEHOLDER,
+                "next_placeholder": NEXT_PLACEHOLDER,
+            })
+
+    if missing:
+        cache.set_many(missing, timeout=CARD_TIMEOUT)
+        fragments.update(missing)
+
+    html = "".join(fragments[key] for key in keys)
+    html = html.replace(CSRF_PLACEHOLDER, get_token(request))
+    html = html.replace(NEXT_PLACEHOLDER, escape(request.get_full_path()))
+
+    return mark_safe(html)
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products import recommendations
+from products.cache import bump_catalog_version
+
+
+class Command(BaseCommand):
+    help = 'Update "frequently bought together" recommendations from paid orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild from all paid orders instead of those since the last run',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=recommendations.TOP_K,
+            help=f'Recommendations kept per product (default: {recommendations.TOP_K})',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        mode = 'full rebuild' if options['full'] else 'incremental'
+        self.stdout.write(f'🔄 Building recommendations ({mode})...')
+
+        orders, pairs, products = recommendations.refresh(
+            full=options['full'],
+            top_k=options['top'],
+        )
+
+        if products or options['full']:
+            bump_catalog_version()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {orders} orders, {pairs} product pairs, '
+            f'{products} products refreshed in {elapsed:.2f}s'
+        ))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from products import cache as catalog_cache
+
+
+class Command(BaseCommand):
+    help = 'Show catalog cache hit/miss counters (each process adds its lookups every 100)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset the counters after printing them',
+        )
+        parser.add_argument(
+            '--invalidate',
+            action='store_true',
+            help='Bump the catalog version, dropping every cached page',
+        )
+
+    def handle(self, *args, **options):
+        stats = catalog_cache.get_stats()
+
+        self.stdout.write(f"Catalog version: {stats['version']}")
+        self.stdout.write(f"Hits:            {stats['hits']}")
+        self.stdout.write(f"Misses:          {stats['misses']}")
+        self.stdout.write(f"Hit ratio:       {stats['hit_ratio']:.1%}")
+
+        if options['reset']:
+            catalog_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('✓ Counters reset'))
+
+        if options['invalidate']:
+            catalog_cache.bump_catalog_version()
+            self.stdout.write(self.style.SUCCESS('✓ Catalog cache invalidated'))
@@ -0,0 +1,201 @@
+import csv
+import json
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from products import search
+from products.cache import bump_catalog_version
+from products.facets import recount_categories
+from products.models import Category, Product
+
+UPDATE_FIELDS = ["name", "description", "price", "stock", "image", "category", "updated_at"]
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+
+class InvalidRow:
+    """Stands in for a line that couldn't be parsed, so it's skipped like any other bad row"""
+
+    def __init__(self, message):
+        self.message = message
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield InvalidRow(f"invalid JSON: {e}")
+
+
+def clean_rows(rows, on_error):
+    """Normalise raw rows, recording and skipping the ones that can't be imported"""
+    for line, row in enumerate(rows, start=1):
+        if isinstance(row, InvalidRow):
+            on_error(line, row.message)
+            continue
+        if not isinstance(row, dict):
+            on_error(line, f"expected an object, got {type(row).__name__}")
+            continue
+
+        try:
+            sku = str(row["sku"]).strip()
+            name = str(row["name"]).strip()
+            category = str(row["category"]).strip()
+            if not sku or not name or not category:
+                raise ValueError("sku, name and category are required")
+
+            try:
+                price = Decimal(str(row["price"]))
+            except InvalidOperation:
+                raise ValueError(f"invalid price {row['price']!r}")
+            stock = int(row.get("stock") or 0)
+            if not price.is_finite() or price < 0 or stock < 0:
+                raise ValueError("price and stock must not be negative")
+        except KeyError as e:
+            on_error(line, f"missing column {e}")
+            continue
+        except ValueError as e:
+            on_error(line, str(e))
+            continue
+
+        yield {
+            "sku": sku[:64],
+            "name": name[:200],
+            "description": str(row.get("description") or ""),
+            "price": price,
+            "stock": stock,
+            "image": str(row.get("image") or ""),
+            "category": category[:100],
+        }
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = 'Stream products from a CSV or JSONL file and upsert them by SKU'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file to import')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'jsonl'],
+            help='File format (default: guessed from the file extension)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Rows written per bulk upsert (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        reader = read_jsonl if file_format == 'jsonl' else read_csv
+
+        # Category name -> id, loaded once and extended as categories are created
+        self.categories = dict(Category.objects.values_list('name', 'id'))
+        self.categories_created = 0
+
+        self.skipped = 0
+        self.skip_samples = []
+        imported = 0
+        started = time.monotonic()
+        self.stdout.write(f'📦 Importing products from {path}...')
+
+        try:
+            for chunk in chunked(clean_rows(reader(path), self.record_error), options['chunk_size']):
+                self.upsert_chunk(chunk)
+                imported += len(chunk)
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(f'   {imported} rows ({imported / elapsed:.0f} rows/s)')
+        except FileNotFoundError:
+            raise CommandError(f'File not found: {path}')
+        except csv.Error as e:
+            raise CommandError(f'Could not parse {path}: {e}')
+        finally:
+            # Upserts can add products or move them between categories without
+            # signals, so refresh every category's facet counts in one
+            # statement. Chunks are committed as they go, so this also runs
+            # when the import stops part-way.
+            if imported:
+                recount_categories()
+                bump_catalog_version()
+
+        elapsed = time.monotonic() - started
+        for line, message in self.skip_samples:
+            self.stdout.write(self.style.WARNING(f'   row {line} skipped: {message}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Imported {imported} products in {elapsed:.2f}s '
+            f'({imported / elapsed if elapsed else 0:.0f} rows/s), '
+            f'{self.categories_created} categories created, {self.skipped} rows skipped'
+        ))
+
+    def record_error(self, line, message):
+        self.skipped += 1
+        # Keep a few examples rather than every error so memory stays flat
+        if len(self.skip_samples) < 20:
+            self.skip_samples.append((line, message))
+
+    def resolve_categories(self, names):
+        missing = [name for name in set(names) if name not in self.categories]
+        if not missing:
+            return
+
+        Category.objects.bulk_create(
+            [Category(name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        created = dict(Category.objects.filter(name__in=missing).values_list('name', 'id'))
+        self.categories.update(created)
+        self.categories_created += len(created)
+
+    @transaction.atomic
+    def upsert_chunk(self, chunk):
+        # The same SKU twice in one statement is an error on PostgreSQL;
+        # keep the last occurrence like sequential updates would
+        rows = {row['sku']: row for row in chunk}.values()
+
+        self.resolve_categories(row['category'] for row in rows)
+
+        Product.objects.bulk_create(
+            [
+                Product(
+                    sku=row['sku'],
+                    name=row['name'],
+                    description=row['description'],
+                    price=row['price'],
+                    stock=row['stock'],
+                    image=row['image'],
+                    category_id=self.categories[row['category']],
+                )
+                for row in rows
+            ],
+            update_conflicts=True,
+            unique_fields=['sku'],
+            update_fields=UPDATE_FIELDS,
+        )
+
+        # bulk_create bypasses the post_save signals that keep the search
+        # index in sync, so index the chunk directly
+        ids = list(
+            Product.objects.filter(sku__in=[row['sku'] for row in rows]).values_list('id', flat=True)
+        )
+        search.get_backend().index_products(ids)
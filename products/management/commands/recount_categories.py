@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from products.cache import bump_catalog_version
+from products.facets import recount_categories
+from products.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalised product counts on every category'
+
+    def handle(self, *args, **options):
+        before = set(Category.objects.values_list('id', 'product_count', 'in_stock_count'))
+        updated = recount_categories()
+        after = set(Category.objects.values_list('id', 'product_count', 'in_stock_count'))
+
+        drifted = len(after - before)
+        if drifted:
+            bump_catalog_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Recounted {updated} categories ({drifted} had drifted)'
+        ))
@@ -0,0 +1,68 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:20
+
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE products_search_index USING fts5(
+        name, description, category, tokenize = 'unicode61', prefix = '2 3'
+    )
+    """,
+    """
+    INSERT INTO products_search_index (rowid, name, description, category)
+    SELECT p.id, p.name, p.description, c.name
+    FROM products_product p
+    JOIN products_category c ON c.id = p.category_id
+    """,
+]
+
+POSTGRES_FORWARD = [
+    """
+    CREATE TABLE products_search_index (
+        product_id bigint PRIMARY KEY
+            REFERENCES products_product (id) ON DELETE CASCADE,
+        document tsvector NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX products_search_index_document_idx
+    ON products_search_index USING GIN (document)
+    """,
+    """
+    INSERT INTO products_search_index (product_id, document)
+    SELECT p.id,
+        setweight(to_tsvector('english', p.name), 'A') ||
+        setweight(to_tsvector('english', c.name), 'B') ||
+        setweight(to_tsvector('english', p.description), 'C')
+    FROM products_product p
+    JOIN products_category c ON c.id = p.category_id
+    """,
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {
+        "sqlite": SQLITE_FORWARD,
+        "postgresql": POSTGRES_FORWARD,
+    }.get(vendor, [])
+
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ("sqlite", "postgresql"):
+        schema_editor.execute("DROP TABLE IF EXISTS products_search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
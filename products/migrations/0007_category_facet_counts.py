@@ -0,0 +1,46 @@
+# Generated by Django 6.0.2 on 2026-10-18 18:10
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_counts(apps, schema_editor):
+    Category = apps.get_model('products', 'Category')
+    Product = apps.get_model('products', 'Product')
+
+    def count(condition=Q()):
+        counts = (
+            Product.objects.filter(condition, category=OuterRef('pk'))
+            .order_by()
+            .values('category')
+            .annotate(total=Count('id'))
+            .values('total')
+        )
+        return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+    Category.objects.update(
+        product_count=count(),
+        in_stock_count=count(Q(stock__gt=0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_sku'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='in_stock_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+    ]
@@ -4,18 +4,44 @@ from cloudinary.models import CloudinaryField
     
 
 
+def _fields_except(model, excluded):
+    """Names of the columns a full save of `model` writes, minus `excluded`"""
+    return [
+        field.name
+        for field in model._meta.concrete_fields
+        if not field.primary_key and field.name not in excluded
+    ]
+
+
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    # Denormalised facet counts, maintained by products.facets
+    product_count = models.PositiveIntegerField(default=0)
+    in_stock_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Only ever moved by F() updates; a full save (e.g. from the admin)
+    # would write back the values loaded with the instance and lose
+    # concurrent increments
+    COUNTER_FIELDS = ("product_count", "in_stock_count")
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = _fields_except(Category, self.COUNTER_FIELDS)
+        super().save(*args, **kwargs)
+
 
 class Product(models.Model):
+    sku = models.CharField(max_length=64, unique=True, blank=True, null=True)
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField()
+    # Units held by live checkout reservations (orders.StockReservation)
+    reserved = models.PositiveIntegerField(default=0)
     image = CloudinaryField('image')
     category = models.ForeignKey(
         Category,
@@ -23,6 +49,106 @@ class Product(models.Model):
         related_name="products"
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Only ever moved by the F() updates in orders.reservations
+    COUNTER_FIELDS = ("reserved",)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination over in-stock products, newest first
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(stock__gt=0),
+                name="product_instock_recent_idx",
+            ),
+            models.Index(
+                fields=["category", "-created_at", "-id"],
+                condition=models.Q(stock__gt=0),
+                name="product_cat_recent_idx",
+            ),
+            models.Index(fields=["price"], name="product_price_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored category and stock so saves can tell how the
+        # category facet counts change
+        instance._loaded_facets = {
+            name: value
+            for name, value in zip(field_names, values)
+            if name in ("category_id", "stock")
+        }
+        return instance
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = _fields_except(Product, self.COUNTER_FIELDS)
+        super().save(*args, **kwargs)
+
+    @property
+    def available_stock(self):
+        """
+        Stock not held by a checkout reservation. Holds don't move the
+        catalog version, so the cached catalog pages show `stock` and only
+        uncached reads (search, cart, checkout) use this.
+        """
+        return max(self.stock - self.reserved, 0)
+
+class ProductPairCount(models.Model):
+    """How many paid orders contained both products (stored once, a < b)"""
+    product_a = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    product_b = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product_a", "product_b"],
+                name="unique_product_pair",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["product_b"], name="product_pair_b_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_a_id} + {self.product_b_id}: {self.count}"
+
+
+class Recommendation(models.Model):
+    """Precomputed "frequently bought together" neighbours of a product"""
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="recommendations"
+    )
+    recommended = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    score = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ["product", "rank"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "rank"],
+                name="unique_recommendation_rank",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.recommended_id} (#{self.rank})"
+
+
+class RecommendationRun(models.Model):
+    """Watermark for incremental recommendation refreshes"""
+    paid_until = models.DateTimeField(blank=True, null=True)
+    orders_processed = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f"Recommendation run {self.created_at:%Y-%m-%d %H:%M}"
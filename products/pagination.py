@@ -0,0 +1,60 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+PAGE_SIZE = 24
+
+
+def encode_cursor(created_at, pk):
+    """Encode the (created_at, id) position of a row into an opaque token"""
+    raw = f"{created_at.isoformat()}|{pk}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """Decode a cursor token, returning None when it is missing or malformed"""
+    if not token:
+        return None
+
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_at, pk = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeError):
+        return None
+
+
+def keyset_page(queryset, cursor=None, page_size=PAGE_SIZE):
+    """
+    Return one page of `queryset` ordered newest first, plus the cursor of
+    the next page (or None on the last page).
+
+    Rows are located with a `(created_at, id) < cursor` seek instead of an
+    OFFSET, so every page costs one index range scan regardless of depth.
+    """
+    queryset = queryset.order_by("-created_at", "-id")
+
+    position = decode_cursor(cursor)
+    if position:
+        created_at, pk = position
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+
+    # Fetch one extra row to learn whether another page exists
+    rows = list(queryset[:page_size + 1])
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        # Rows are model instances, or dicts when paging a .values() queryset
+        if isinstance(last, dict):
+            next_cursor = encode_cursor(last["created_at"], last["id"])
+        else:
+            next_cursor = encode_cursor(last.created_at, last.id)
+
+    return rows, next_cursor
@@ -0,0 +1,159 @@
+import heapq
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import combinations, groupby, islice
+
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from orders.models import OrderItem
+from .models import ProductPairCount, Recommendation, RecommendationRun
+
+TOP_K = 6
+# Very large orders add O(n²) pairs while saying little about affinity
+MAX_ITEMS_PER_ORDER = 50
+CHUNK_SIZE = 1000
+# paid_at is stamped before the paying transaction commits, so an order can
+# become visible after a run with a paid_at behind that run's watermark.
+# Orders paid this recently are left for a later run, by which time their
+# transaction has committed.
+SETTLE_TIME = timedelta(minutes=5)
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def count_pairs(order_products):
+    """
+    Count product co-occurrences from an iterable of (order_id, product_id)
+    rows sorted by order_id. Returns a sparse {(a, b): count} with a < b.
+    """
+    pairs = Counter()
+    orders = 0
+
+    for _, rows in groupby(order_products, key=lambda row: row[0]):
+        products = sorted({product_id for _, product_id in rows})[:MAX_ITEMS_PER_ORDER]
+        pairs.update(combinations(products, 2))
+        orders += 1
+
+    return pairs, orders
+
+
+def merge_pair_counts(pairs):
+    """Add new co-occurrence counts onto the stored ones"""
+    for chunk in _chunks(pairs.items(), CHUNK_SIZE):
+        a_ids = {a for (a, _), _ in chunk}
+        b_ids = {b for (_, b), _ in chunk}
+        existing = {
+            (a, b): count
+            for a, b, count in ProductPairCount.objects.filter(
+                product_a__in=a_ids, product_b__in=b_ids
+            ).values_list("product_a", "product_b", "count")
+        }
+
+        ProductPairCount.objects.bulk_create(
+            [
+                ProductPairCount(
+                    product_a_id=a,
+                    product_b_id=b,
+                    count=existing.get((a, b), 0) + count,
+                )
+                for (a, b), count in chunk
+            ],
+            update_conflicts=True,
+            unique_fields=["product_a", "product_b"],
+            update_fields=["count"],
+        )
+
+
+def rebuild_recommendations(product_ids, top_k=TOP_K):
+    """Recompute the top-K neighbours of the given products from the pair counts"""
+    for chunk in _chunks(sorted(product_ids), CHUNK_SIZE):
+        wanted = set(chunk)
+        neighbours = defaultdict(list)
+
+        for a, b, count in ProductPairCount.objects.filter(
+            Q(product_a__in=chunk) | Q(product_b__in=chunk)
+        ).values_list("product_a", "product_b", "count").iterator(chunk_size=CHUNK_SIZE):
+            if a in wanted:
+                neighbours[a].append((count, -b, b))
+            if b in wanted:
+                neighbours[b].append((count, -a, a))
+
+        recommendations = []
+        for product_id, candidates in neighbours.items():
+            # Highest count first, lower product id breaks ties
+            best = heapq.nlargest(top_k, candidates)
+            recommendations.extend(
+                Recommendation(
+                    product_id=product_id,
+                    recommended_id=other_id,
+                    score=count,
+                    rank=rank,
+                )
+                for rank, (count, _, other_id) in enumerate(best, start=1)
+            )
+
+        Recommendation.objects.filter(product_id__in=chunk).delete()
+        Recommendation.objects.bulk_create(recommendations, batch_size=CHUNK_SIZE)
+
+
+@transaction.atomic
+def refresh(full=False, top_k=TOP_K):
+    """
+    Fold paid orders since the last run into the pair counts and refresh the
+    recommendations of every product they touched. `full` starts over from
+    all paid orders.
+    """
+    last_run = None if full else RecommendationRun.objects.order_by("-created_at").first()
+    paid_since = last_run.paid_until if last_run else None
+
+    orders = OrderItem.objects.filter(
+        order__is_paid=True,
+        order__paid_at__lte=timezone.now() - SETTLE_TIME,
+    )
+    if paid_since:
+        orders = orders.filter(order__paid_at__gt=paid_since)
+
+    # Fix the upper bound up front so orders paid while this runs are left
+    # for the next run instead of being counted twice
+    paid_until = orders.aggregate(latest=Max("order__paid_at"))["latest"] or paid_since
+    if paid_until:
+        orders = orders.filter(order__paid_at__lte=paid_until)
+
+    if full:
+        ProductPairCount.objects.all().delete()
+        Recommendation.objects.all().delete()
+
+    rows = (
+        orders.order_by("order_id")
+        .values_list("order_id", "product_id")
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    pairs, order_count = count_pairs(rows)
+
+    merge_pair_counts(pairs)
+
+    touched = {product_id for pair in pairs for product_id in pair}
+    rebuild_recommendations(touched, top_k)
+
+    RecommendationRun.objects.create(paid_until=paid_until, orders_processed=order_count)
+
+    return order_count, len(pairs), len(touched)
+
+
+def recommended_products(product_id):
+    """In-stock recommendations for a product, read with one indexed query"""
+    return [
+        recommendation.recommended
+        for recommendation in Recommendation.objects.filter(
+            product_id=product_id,
+            recommended__stock__gt=0,
+        ).select_related("recommended").only(
+            "recommended", "recommended__name", "recommended__price"
+        ).order_by("rank")
+    ]
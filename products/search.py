@@ -0,0 +1,194 @@
+"""
+Full-text product search.
+
+The index lives in a side table, `products_search_index`, created by
+migration 0004: an FTS5 virtual table on SQLite and a weighted `tsvector`
+column with a GIN index on PostgreSQL. Rows are kept in sync from the
+Product/Category signals and can be rebuilt with
+`manage.py rebuild_search_index`.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Product
+
+INDEX_TABLE = "products_search_index"
+MAX_TERMS = 10
+
+
+def _terms(query):
+    """Split free text into safe search terms (no FTS operator syntax)"""
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+class SQLiteSearchBackend:
+    """FTS5 index ranked with bm25 (name weighted over category over description)"""
+
+    def _index_where(self, clause, params):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {INDEX_TABLE} WHERE rowid IN "
+                f"(SELECT p.id FROM products_product p WHERE {clause})",
+                params,
+            )
+            cursor.execute(
+                f"INSERT INTO {INDEX_TABLE} (rowid, name, description, category) "
+                f"SELECT p.id, p.name, p.description, c.name "
+                f"FROM products_product p "
+                f"JOIN products_category c ON c.id = p.category_id "
+                f"WHERE {clause}",
+                params,
+            )
+
+    def index_products(self, ids):
+        placeholders = ", ".join(["%s"] * len(ids))
+        self._index_where(f"p.id IN ({placeholders})", list(ids))
+
+    def index_category(self, category_id):
+        self._index_where("p.category_id = %s", [category_id])
+
+    def index_range(self, start_id, end_id):
+        self._index_where("p.id >= %s AND p.id < %s", [start_id, end_id])
+
+    def remove_products(self, ids):
+        placeholders = ", ".join(["%s"] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {INDEX_TABLE} WHERE rowid IN ({placeholders})",
+                list(ids),
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {INDEX_TABLE}")
+
+    def search_ids(self, query, limit, offset=0):
+        terms = _terms(query)
+        if not terms:
+            return []
+
+        match = " ".join(f'"{term}"*' for term in terms)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {INDEX_TABLE}.rowid FROM {INDEX_TABLE} "
+                f"JOIN products_product p ON p.id = {INDEX_TABLE}.rowid "
+                f"WHERE {INDEX_TABLE} MATCH %s AND p.stock > 0 "
+                f"ORDER BY bm25({INDEX_TABLE}, 10.0, 1.0, 4.0) "
+                f"LIMIT %s OFFSET %s",
+                [match, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    """tsvector + GIN index ranked with ts_rank over A/B/C weighted fields"""
+
+    DOCUMENT_SQL = (
+        "setweight(to_tsvector('english', p.name), 'A') || "
+        "setweight(to_tsvector('english', c.name), 'B') || "
+        "setweight(to_tsvector('english', p.description), 'C')"
+    )
+
+    def _index_where(self, clause, params):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {INDEX_TABLE} (product_id, document) "
+                f"SELECT p.id, {self.DOCUMENT_SQL} "
+                f"FROM products_product p "
+                f"JOIN products_category c ON c.id = p.category_id "
+                f"WHERE {clause} "
+                f"ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document",
+                params,
+            )
+
+    def index_products(self, ids):
+        self._index_where("p.id = ANY(%s)", [list(ids)])
+
+    def index_category(self, category_id):
+        self._index_where("p.category_id = %s", [category_id])
+
+    def index_range(self, start_id, end_id):
+        self._index_where("p.id >= %s AND p.id < %s", [start_id, end_id])
+
+    def remove_products(self, ids):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {INDEX_TABLE} WHERE product_id = ANY(%s)",
+                [list(ids)],
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {INDEX_TABLE}")
+
+    def search_ids(self, query, limit, offset=0):
+        terms = _terms(query)
+        if not terms:
+            return []
+
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT s.product_id FROM {INDEX_TABLE} s "
+                f"JOIN products_product p ON p.id = s.product_id, "
+                f"to_tsquery('english', %s) query "
+                f"WHERE s.document @@ query AND p.stock > 0 "
+                f"ORDER BY ts_rank(s.document, query) DESC, s.product_id "
+                f"LIMIT %s OFFSET %s",
+                [tsquery, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class FallbackSearchBackend:
+    """Unindexed icontains search for databases without a full-text backend"""
+
+    def index_products(self, ids):
+        pass
+
+    def index_category(self, category_id):
+        pass
+
+    def index_range(self, start_id, end_id):
+        pass
+
+    def remove_products(self, ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def search_ids(self, query, limit, offset=0):
+        terms = _terms(query)
+        if not terms:
+            return []
+
+        products = Product.objects.filter(stock__gt=0)
+        for term in terms:
+            products = products.filter(
+                Q(name__icontains=term)
+                | Q(description__icontains=term)
+                | Q(category__name__icontains=term)
+            )
+
+        return list(products.order_by("-id").values_list("id", flat=True)[offset:offset + limit])
+
+
+def get_backend():
+    if connection.vendor == "sqlite":
+        return SQLiteSearchBackend()
+    if connection.vendor == "postgresql":
+        return PostgresSearchBackend()
+    return FallbackSearchBackend()
+
+
+def search_products(query, limit, offset=0):
+    """Return in-stock products matching `query`, best match first"""
+    ids = get_backend().search_ids(query, limit, offset)
+
+    products = Product.objects.only("id", "name", "price", "stock", "reserved", "image").in_bulk(ids)
+    return [products[pk] for pk in ids if pk in products]
@@ -0,0 +1,127 @@
+from functools import lru_cache
+
+import cloudinary
+from django.db.models import CharField
+from django.db.models.functions import Cast
+from rest_framework.exceptions import ValidationError
+
+
+@lru_cache(maxsize=1)
+def _image_url_prefix():
+    """Everything before the stored path in a Cloudinary delivery URL"""
+    probe = cloudinary.CloudinaryImage("probe").build_url()
+    return probe[:-len("image/upload/probe")]
+
+
+def image_url(value):
+    """
+    Turn the raw stored CloudinaryField value (e.g. "image/upload/v1/x.jpg")
+    into a delivery URL without building a CloudinaryResource per row.
+    """
+    if not value:
+        return None
+    if not value.startswith(("image/", "raw/", "video/")):
+        value = f"image/upload/{value}"
+    return _image_url_prefix() + value
+
+
+def _decimal(value):
+    return str(value)
+
+
+def _datetime(value):
+    return value.isoformat()
+
+
+class ValuesSerializer:
+    """
+    Serialize rows from a `.values()` queryset.
+
+    `fields` maps each public field name to the lookup it is read from and
+    an optional transform. Only the lookups of the requested fields are
+    selected, so sparse fieldsets also mean narrower queries.
+    """
+
+    fields = {}
+    default_fields = None
+    # Lookups needed by the view itself (e.g. the pagination key)
+    required_lookups = ()
+    # Lookups that must be selected through an expression
+    expressions = {}
+
+    def __init__(self, requested=None):
+        if requested:
+            names = [name.strip() for name in requested.split(",") if name.strip()]
+            unknown = [name for name in names if name not in self.fields]
+            if unknown:
+                raise ValidationError({
+                    "fields": f"Unknown field(s): {', '.join(unknown)}. "
+                              f"Available: {', '.join(self.fields)}."
+                })
+        else:
+            names = list(self.default_fields or self.fields)
+
+        self.names = names
+
+    def lookups(self):
+        lookups = dict.fromkeys(self.required_lookups)
+        for name in self.names:
+            lookups[self.fields[name][0]] = None
+        return list(lookups)
+
+    def select(self, queryset):
+        plain = []
+        annotated = {}
+        for lookup in self.lookups():
+            if lookup in self.expressions:
+                annotated[lookup] = self.expressions[lookup]
+            else:
+                plain.append(lookup)
+        return queryset.values(*plain, **annotated)
+
+    def to_representation(self, row):
+        data = {}
+        for name in self.names:
+            lookup, transform = self.fields[name]
+            value = row[lookup]
+            if transform is not None and value is not None:
+                value = transform(value)
+            data[name] = value
+        return data
+
+    def serialize(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+
+class ProductSerializer(ValuesSerializer):
+    fields = {
+        "id": ("id", None),
+        "name": ("name", None),
+        "description": ("description", None),
+        "price": ("price", _decimal),
+        "stock": ("stock", None),
+        "image": ("image_path", image_url),
+        "category": ("category_id", None),
+        "category_name": ("category__name", None),
+        "created_at": ("created_at", _datetime),
+        "updated_at": ("updated_at", _datetime),
+    }
+    default_fields = (
+        "id", "name", "price", "stock", "image", "category", "category_name",
+    )
+    required_lookups = ("id", "created_at")
+    expressions = {
+        # Read the raw column so CloudinaryField doesn't parse every row
+        "image_path": Cast("image", output_field=CharField()),
+    }
+
+
+class CategorySerializer(ValuesSerializer):
+    fields = {
+        "id": ("id", None),
+        "name": ("name", None),
+        "product_count": ("product_count", None),
+        "in_stock_count": ("in_stock_count", None),
+        "updated_at": ("updated_at", _datetime),
+    }
+    default_fields = ("id", "name", "in_stock_count")
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import facets, search
+from .cache import bump_catalog_version
+from .models import Category, Product
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_cache(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    search.get_backend().index_products([instance.id])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    search.get_backend().remove_products([instance.id])
+
+
+@receiver(post_save, sender=Category)
+def reindex_category(sender, instance, created, **kwargs):
+    # A renamed category changes the indexed text of all its products
+    if not created:
+        search.get_backend().index_category(instance.id)
+
+
+@receiver(post_save, sender=Product)
+def update_category_facets(sender, instance, created, **kwargs):
+    facets.product_saved(instance, created)
+
+
+@receiver(post_delete, sender=Product)
+def release_category_facets(sender, instance, **kwargs):
+    facets.product_deleted(instance)
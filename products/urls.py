@@ -1,7 +1,11 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path("", views.product_list, name="product_list"),
     path("<int:product_id>/", views.product_detail, name="product_detail"),
+    path("search/", views.search, name="product_search"),
+    path("api/products/", api.product_list, name="api_product_list"),
+    path("api/products/<int:product_id>/", api.product_detail, name="api_product_detail"),
+    path("api/categories/", api.category_list, name="api_category_list"),
 ]
\ No newline at end of file
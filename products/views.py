@@ -1,19 +1,123 @@
-from django.shortcuts import render, get_object_or_404
-from .models import Product
+from django.http import Http404
+from django.shortcuts import render
+from . import cache as catalog_cache
+from .conditional import (
+    catalog_condition,
+    product_detail_etag,
+    product_detail_last_modified,
+    product_list_etag,
+    product_list_last_modified,
+)
+from .filters import filter_products, listing_filters
+from .fragments import render_product_cards
+from .models import Category, Product
+from .pagination import PAGE_SIZE, keyset_page
+from .recommendations import recommended_products
+from .search import search_products
 
 
+def _load_product_page(category_id, min_price, max_price, cursor):
+    products = filter_products(
+        Product.objects.filter(stock__gt=0), category_id, min_price, max_price
+    )
+
+    # Only load the columns the product cards render (plus the cursor and
+    # fragment cache keys)
+    products = products.only("id", "name", "price", "stock", "image", "created_at", "updated_at")
+
+    return keyset_page(products, cursor)
+
+
+@catalog_condition(product_list_etag, product_list_last_modified)
 def product_list(request):
 
-    products = Product.objects.filter(stock__gt=0)
+    # Optional filters: ?category=<id>&min_price=<n>&max_price=<n>
+    category_id, min_price, max_price = listing_filters(request.GET)
+    cursor = request.GET.get("cursor")
+
+    page, next_cursor = catalog_cache.get_or_build(
+        "list",
+        (category_id, min_price, max_price, cursor),
+        lambda: _load_product_page(category_id, min_price, max_price, cursor),
+    )
+
+    categories = catalog_cache.get_or_build(
+        "categories",
+        (),
+        lambda: list(
+            Category.objects.filter(in_stock_count__gt=0)
+            .only("id", "name", "in_stock_count")
+            .order_by("name")
+        ),
+    )
+
+    # Pagination links keep the active filters
+    params = request.GET.copy()
+    params.pop("cursor", None)
+    first_query = params.urlencode()
+
+    next_query = None
+    if next_cursor:
+        params["cursor"] = next_cursor
+        next_query = params.urlencode()
 
     return render(request, "products/list.html", {
-        "products": products
+        "product_cards": render_product_cards(request, page),
+        "categories": categories,
+        "selected_category": category_id,
+        "min_price": min_price,
+        "max_price": max_price,
+        "first_query": first_query,
+        "next_query": next_query,
+        "is_first_page": cursor is None,
     })
 
 
+def _load_product(product_id):
+    try:
+        return Product.objects.select_related("category").get(id=product_id)
+    except Product.DoesNotExist:
+        raise Http404("No Product matches the given query.")
+
+
+@catalog_condition(product_detail_etag, product_detail_last_modified)
 def product_detail(request, product_id):
-    product = get_object_or_404(Product, id=product_id)
+    product = catalog_cache.get_or_build(
+        "detail",
+        (product_id,),
+        lambda: _load_product(product_id),
+    )
+
+    recommendations = catalog_cache.get_or_build(
+        "recommendations",
+        (product_id,),
+        lambda: recommended_products(product_id),
+    )
 
     return render(request, "products/detail.html", {
-        "product": product
-    })
\ No newline at end of file
+        "product": product,
+        "recommendations": recommendations,
+    })
+
+
+def search(request):
+    """Full-text search over product name, description and category"""
+    query = request.GET.get("q", "").strip()
+
+    page = request.GET.get("page", "1")
+    page = max(int(page), 1) if page.isdigit() else 1
+
+    results = []
+    has_next = False
+    if query:
+        # Fetch one extra result to learn whether another page exists
+        results = search_products(query, PAGE_SIZE + 1, (page - 1) * PAGE_SIZE)
+        has_next = len(results) > PAGE_SIZE
+        results = results[:PAGE_SIZE]
+
+    return render(request, "products/search.html", {
+        "query": query,
+        "products": results,
+        "page": page,
+        "has_next": has_next,
+    })